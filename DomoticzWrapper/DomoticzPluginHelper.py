@@ -79,7 +79,7 @@ class DomoticzPluginHelper:
         self.__d.Log("onDisconnect called")
 
     def onHeartbeat(self):
-        if not all(device in self.__d.Devices for device in self.InitializedDeviceUnits):
+        if not self.InitializedDeviceUnits <= self.__d.Devices.keys():
             self.__d.Error(
                 "Found " + str(len(self.__d.Devices)) + " devices, while plugin expects " + str(len(self.InitializedDeviceUnits)) + ". Please check domoticz device creation settings and restart !")
             return
@@ -209,6 +209,40 @@ class DomoticzPluginHelper:
             "-InternalVariables"
         self.DomoticzAPI(f"type=command&param=updateuservariable&vname={varname}&vtype=2&vvalue={str(self.Internals)}")
 
+    def GetConfigItem(self, Key: str = None, Default=None):
+        """Read an item of the plugin configuration stored in the Domoticz database
+
+        Keyword Arguments:
+            Key {str} -- Item to read, the whole configuration if None (default: {None})
+            Default {any} -- Value returned when the item is not stored (default: {None})
+        """
+        try:
+            config = self.__d.Configuration()
+            return config if Key is None else config[Key]
+        except KeyError:
+            return Default
+        except Exception as inst:
+            self.__d.Error("Domoticz.Configuration read failed: '{}'".format(inst))
+            return Default
+
+    def SetConfigItem(self, Key: str = None, Value=None):
+        """Store an item of the plugin configuration in the Domoticz database
+
+        Keyword Arguments:
+            Key {str} -- Item to write, the whole configuration if None (default: {None})
+            Value {any} -- Value to store (default: {None})
+        """
+        try:
+            config = self.__d.Configuration()
+            if Key is None:
+                config = Value
+            else:
+                config[Key] = Value
+            return self.__d.Configuration(config)
+        except Exception as inst:
+            self.__d.Error("Domoticz.Configuration operation failed: '{}'".format(inst))
+            return {}
+
     def WriteLog(self, message, level="Normal"):
         if (self.logLevel == "Verbose" and level == "Verbose") or level == "Status":
             if self.statusSupported and level == "Status":
@@ -175,6 +175,9 @@ class DomoticzWrapper:
         self.__Parameters = _Parameters
         self.__Devices = _Devices
         self.__Images = _Images
+        # Wrappers are reused, and kept in sync by DomoticzDevice.Create and Delete
+        self.__DeviceWrappers: Dict[int, DomoticzDevice] = {}
+        self.__ParametersWrapper: DomoticzPluginParameters = None
 
     @property
     def Domoticz(self):
@@ -201,16 +204,42 @@ class DomoticzWrapper:
 
     @property
     def Parameters(self) -> DomoticzPluginParameters:
-        return DomoticzPluginParameters(self.__Parameters)
+        # Parameters remain static for the lifetime of the plugin
+        if self.__ParametersWrapper is None:
+            self.__ParametersWrapper = DomoticzPluginParameters(self.__Parameters)
+        return self.__ParametersWrapper
 
     @property
     def Devices(self) -> Dict[int, DomoticzDevice]:
         """Dictionary of device ids to device objects
 
+        The same dictionary and wrappers are returned on every call, they must not be modified.
+
         Returns:
             Dict[int, DomoticzDevice] -- Dictionary of device ids to device objects
         """
-        return dict([(k, DomoticzDevice(Device=self.__Devices[k])) for k in self.__Devices])
+        if len(self.__DeviceWrappers) != len(self.__Devices):
+            # Devices created or removed by Domoticz itself, e.g. from the web UI
+            self.RefreshDevices()
+        return self.__DeviceWrappers
+
+    def RefreshDevices(self):
+        """Synchronize the device wrappers with the Domoticz devices"""
+        for k in self.__DeviceWrappers.keys() - self.__Devices.keys():
+            del self.__DeviceWrappers[k]
+        for k in self.__Devices:
+            wrapper = self.__DeviceWrappers.get(k)
+            if wrapper is None or wrapper._Device is not self.__Devices[k]:
+                self.__DeviceWrappers[k] = DomoticzDevice(d=self, Device=self.__Devices[k])
+
+    def DeviceCreated(self, device: DomoticzDevice):
+        """Register the wrapper of a device created by the plugin"""
+        self.__DeviceWrappers[device.Unit] = device
+
+    def DeviceDeleted(self, device: DomoticzDevice):
+        """Forget the wrapper of a device deleted by the plugin"""
+        if self.__DeviceWrappers.get(device.Unit) is device:
+            del self.__DeviceWrappers[device.Unit]
 
     @property
     def Images(self) -> Dict[str, DomoticzImage]:
@@ -350,6 +379,8 @@ class DomoticzWrapper:
         Returns:
             Dict[str, str] -- Resulting configuration object
         """
+        if val is None:
+            return self.__Domoticz.Configuration()
         return self.__Domoticz.Configuration(val)
 
 
@@ -382,6 +413,7 @@ class DomoticzDevice:
         - DeviceID {str} -- Set the DeviceID to be used with the device. Only required to override the default which is an eight digit number dervice from the HardwareID and the Unit number in the format "000H000U".
         Field type is Varchar(25) (default: {None})
         """
+        self._d = d
         if Device is not None:
             self._Device = Device
         elif DeviceType is None and TypeName is not None:
@@ -458,6 +490,8 @@ class DomoticzDevice:
     def Create(self):
         """Creates the device in Domoticz from the object."""
         self._Device.Create()
+        if self._d is not None:
+            self._d.DeviceCreated(self)
 
     def Update(self, nValue: int, sValue: str, **kvargs):
         """Updates the current values in Domoticz.
@@ -489,6 +523,8 @@ class DomoticzDevice:
     def Delete(self):
         """Deletes the device in Domoticz"""
         self._Device.Delete()
+        if self._d is not None:
+            self._d.DeviceDeleted(self)
 
     def Refresh(self):
         """Refreshes the values for the device from the Domoticz database.
@@ -511,6 +547,15 @@ class DomoticzDevice:
         """
         return self._Device.ID
 
+    @property
+    def Unit(self) -> int:
+        """Plugin index of the Device, key of the Devices dictionary
+
+        Returns:
+            int -- Plugin index of the Device
+        """
+        return self._Device.Unit
+
     @property
     def Name(self) -> str:
         """Current Name in Domoticz
@@ -0,0 +1,171 @@
+"""asyncio scanner of Govee advertisements on a raw HCI socket.
+
+    async with GoveeScanner(config) as scanner:
+        async for reading in scanner.readings():
+            print(reading.mac, reading.temperature, reading.humidity)
+
+Events are read from the event loop with add_reader, no thread is started.
+Several adapters are scanned concurrently, each advertisement heard by more
+than one of them being streamed once.
+"""
+import asyncio
+import logging
+import socket
+from typing import AsyncIterator, List, Optional, Sequence, Set, Union
+
+from const import CONF_DEDUP_WINDOW, CONF_GOVEE_DEVICES, CONF_HCI_DEVICE, DEFAULT_DEDUP_WINDOW, DEFAULT_HCI_DEVICE
+from dedup import AdapterDeduplicator
+from govee_advertisement import (
+    GoveeReading,
+    address_from_mac,
+    iter_advertising_reports,
+    parse_report,
+    twos_complement,
+)
+from hci import (
+    EVT_LE_ADVERTISING_REPORT,
+    HCI_MAX_EVENT_SIZE,
+    adapter_names,
+    decode_meta_event,
+    hci_device_id,
+    le_set_scan_enable,
+    le_set_scan_parameters,
+    open_hci_socket,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Readings buffered before the oldest ones are dropped
+DEFAULT_QUEUE_SIZE = 1024
+
+
+class GoveeScanner:
+    """Async context manager scanning for Govee advertisements.
+
+    Readings of the configured devices, or of every Govee device if none
+    are configured, are streamed by readings().  When the consumer falls
+    behind, the oldest readings are dropped and counted in dropped.
+    Readings end when every adapter is gone.
+    """
+
+    def __init__(
+        self,
+        config,
+        sock: Optional[Union[socket.socket, Sequence[socket.socket]]] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        """Init, sock replaces the HCI sockets of the configured devices."""
+        self.config = config
+        if sock is None:
+            self._socks: List[socket.socket] = []
+        elif isinstance(sock, socket.socket):
+            self._socks = [sock]
+        else:
+            self._socks = list(sock)
+        self._open: Set[int] = set()  # Adapters still read
+        self._dedup: Optional[AdapterDeduplicator] = None
+        self._queue_size = queue_size
+        self._queue: Optional["asyncio.Queue[Optional[GoveeReading]]"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._buffer = bytearray(HCI_MAX_EVENT_SIZE)
+        self._addresses: Optional[Set[bytes]] = None
+        if config.get(CONF_GOVEE_DEVICES):
+            self._addresses = {address_from_mac(dev["mac"]) for dev in config[CONF_GOVEE_DEVICES]}
+        self.dropped = 0
+
+    async def __aenter__(self) -> "GoveeScanner":
+        """Open the HCI sockets and start scanning."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self._queue_size)
+        try:
+            if not self._socks:
+                names = adapter_names(self.config.get(CONF_HCI_DEVICE, DEFAULT_HCI_DEVICE))
+                for device_id in [hci_device_id(name) for name in names]:
+                    self._socks.append(open_hci_socket(device_id))
+            if len(self._socks) > 1:
+                self._dedup = AdapterDeduplicator(self.config.get(CONF_DEDUP_WINDOW, DEFAULT_DEDUP_WINDOW))
+            for source, sock in enumerate(self._socks):
+                sock.setblocking(False)
+                self._loop.add_reader(sock.fileno(), self._read_events, source)
+                self._open.add(source)
+                sock.send(le_set_scan_parameters())
+                sock.send(le_set_scan_enable(True))
+        except (OSError, ValueError):
+            self._close()
+            raise
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        """Stop scanning and close the HCI sockets."""
+        for source in self._open:
+            try:
+                self._socks[source].send(le_set_scan_enable(False))
+            except OSError as error:
+                _LOGGER.debug("Error stopping scan: {}".format(error))
+        self._close()
+        self._publish(None)
+
+    def _close(self) -> None:
+        """Stop reading and close every HCI socket."""
+        for source in self._open:
+            self._loop.remove_reader(self._socks[source].fileno())
+        self._open.clear()
+        for sock in self._socks:
+            sock.close()
+        self._socks = []
+        self._dedup = None
+
+    def _remove(self, source: int) -> None:
+        """Stop reading an adapter, ending the readings after the last one."""
+        self._loop.remove_reader(self._socks[source].fileno())
+        self._open.discard(source)
+        if not self._open:
+            self._publish(None)
+
+    def _publish(self, reading: Optional[GoveeReading]) -> None:
+        """Queue a reading, dropping the oldest one when full."""
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(reading)
+
+    def _read_events(self, source: int) -> None:
+        """Read every pending event from the HCI socket of an adapter."""
+        sock = self._socks[source]
+        view = memoryview(self._buffer)
+        while True:
+            try:
+                size = sock.recv_into(self._buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as error:
+                # Adapter gone (ENODEV, ENETDOWN...), stop reading it
+                _LOGGER.error("Error reading HCI socket: {}".format(error))
+                self._remove(source)
+                return
+            if not size:
+                # Socket closed by the other end
+                self._remove(source)
+                return
+            event = decode_meta_event(view[:size])
+            if event is None or event.subevent_code != EVT_LE_ADVERTISING_REPORT:
+                continue
+            for report in iter_advertising_reports(event.data):
+                address = bytes(report[2:8])
+                if self._addresses is not None and address not in self._addresses:
+                    continue
+                if self._dedup is not None and not self._dedup.accept(
+                    address, report[9:-1], twos_complement(report[-1], 8), source, self._loop.time()
+                ):
+                    continue
+                reading = parse_report(report)
+                if reading is not None and reading.packet is not None:
+                    self._publish(reading)
+
+    async def readings(self) -> AsyncIterator[GoveeReading]:
+        """Stream decoded readings until the scanner is closed."""
+        while True:
+            reading = await self._queue.get()
+            if reading is None:
+                return
+            yield reading
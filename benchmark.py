@@ -0,0 +1,257 @@
+"""Throughput benchmark of the advertisement parsing and aggregation pipeline.
+
+Runs every benchmark over a synthetic corpus (see synthetic.py) and reports
+packets per second and memory allocated per packet.  Results can be saved
+as a JSON baseline and later runs compared against it.  Throughput depends
+on the machine, so no baseline is committed: CI saves one from the target
+branch, then compares the change on the same runner:
+
+    git checkout main && python3 benchmark.py --save --baseline /tmp/baseline.json
+    git checkout - && python3 benchmark.py --compare --baseline /tmp/baseline.json
+"""
+from argparse import ArgumentParser
+from json import dump, load
+from time import perf_counter
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Sequence, Tuple
+import gc
+import os
+import platform
+import sys
+import tracemalloc
+
+from const import (
+    CONF_DECIMALS,
+    CONF_GOVEE_DEVICES,
+    CONF_LOG_SPIKES,
+    CONF_ROUNDING,
+    CONF_TEMP_RANGE_MAX_CELSIUS,
+    CONF_TEMP_RANGE_MIN_CELSIUS,
+    DEFAULT_DECIMALS,
+    DEFAULT_TEMP_RANGE_MAX,
+    DEFAULT_TEMP_RANGE_MIN,
+)
+from hci import EVT_LE_ADVERTISING_REPORT
+from synthetic import ENCODERS, govee_corpus
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Relative throughput loss tolerated by --compare
+DEFAULT_TOLERANCE = 0.2
+
+Benchmark = Callable[[], Callable[[bytes], object]]
+
+
+def bench_govee_advertisement() -> Callable[[bytes], object]:
+    """Reference parser."""
+    from govee_advertisement import GoveeAdvertisement
+
+    return GoveeAdvertisement
+
+
+def bench_parse_advertisement() -> Callable[[bytes], object]:
+    """Zero-copy parser."""
+    from govee_advertisement import parse_advertisement
+
+    return parse_advertisement
+
+
+def bench_handle_meta_event() -> Callable[[bytes], object]:
+    """Routing, parsing and aggregation of configured devices."""
+    from sensor2 import govee_sensor
+
+    sensor = govee_sensor()
+    sensor.config = {
+        CONF_GOVEE_DEVICES: [{"mac": mac} for mac in CORPUS_MACS.values()],
+        CONF_LOG_SPIKES: False,
+        CONF_ROUNDING: True,
+        CONF_DECIMALS: DEFAULT_DECIMALS,
+        CONF_TEMP_RANGE_MAX_CELSIUS: DEFAULT_TEMP_RANGE_MAX,
+        CONF_TEMP_RANGE_MIN_CELSIUS: DEFAULT_TEMP_RANGE_MIN,
+    }
+    sensor.init_configured_devices()
+
+    def handle(data: bytes) -> None:
+        sensor.handle_meta_event(SimpleNamespace(subevent_code=EVT_LE_ADVERTISING_REPORT, data=data))
+
+    return handle
+
+
+def bench_ble_ht_update() -> Callable[[bytes], object]:
+    """Aggregation of a decoded sample."""
+    from ble_ht import BLE_HT_data
+
+    device = BLE_HT_data(CORPUS_MACS["H5075"], None)
+    update = device.update
+
+    def handle(data: bytes) -> None:
+        update(21.5, 45.3, 2150453)
+
+    return handle
+
+
+def bench_domoticz_heartbeat() -> Callable[[bytes], object]:
+    """Domoticz plugin heartbeat with many devices, one per packet."""
+    from DomoticzPluginHelper import DomoticzDeviceTypes, DomoticzPluginHelper
+
+    devices = {
+        unit: SimpleNamespace(Unit=unit, ID=unit, Name="Temp-Hum {}".format(unit), nValue=0, sValue="0")
+        for unit in range(1, DOMOTICZ_UNITS + 1)
+    }
+    domoticz = SimpleNamespace(Error=print, Debugging=lambda levels: None)
+    helper = DomoticzPluginHelper(domoticz, {"SensorTimeout": "60"}, {"Mode1": "Normal"}, devices, {}, {})
+    for unit in devices:
+        helper.InitDevice(devices[unit].Name, unit, DeviceType=DomoticzDeviceTypes.TempHum())
+
+    def handle(data: bytes) -> None:
+        helper.onHeartbeat()
+        helper.Devices[DOMOTICZ_UNITS].sValue
+
+    return handle
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "govee_advertisement": bench_govee_advertisement,
+    "parse_advertisement": bench_parse_advertisement,
+    "handle_meta_event": bench_handle_meta_event,
+    "ble_ht_update": bench_ble_ht_update,
+    "domoticz_heartbeat": bench_domoticz_heartbeat,
+}
+
+# Devices of the Domoticz heartbeat benchmark (Domoticz units are below 256)
+DOMOTICZ_UNITS = 250
+
+# MAC address of the synthetic device of every model
+CORPUS_MACS = {model: "A4:C1:38:00:00:{:02X}".format(i) for i, model in enumerate(ENCODERS)}
+
+
+def measure(handler: Callable[[bytes], object], corpus: Sequence[bytes], repeat: int) -> Dict[str, float]:
+    """Measure throughput and memory allocated per packet."""
+    count = len(corpus) * repeat
+    gc.collect()
+    gc.disable()
+    try:
+        start = perf_counter()
+        for _ in range(repeat):
+            for data in corpus:
+                handler(data)
+        elapsed = perf_counter() - start
+    finally:
+        gc.enable()
+
+    # CPython does not count allocations, so bytes are traced instead: the
+    # peak of memory allocated during each call, freed or not, and the
+    # memory kept after it.  The cost of tracing itself is measured with a
+    # handler doing nothing and subtracted.
+    tracemalloc.start()
+    try:
+        overhead = _traced(lambda data: None, corpus)[0]
+        transient, retained = _traced(handler, corpus)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "packets_per_second": count / elapsed,
+        "transient_bytes_per_packet": max(transient - overhead, 0.0),
+        "retained_bytes_per_packet": retained,
+    }
+
+
+def _traced(handler: Callable[[bytes], object], corpus: Sequence[bytes]) -> Tuple[float, float]:
+    """Mean traced bytes allocated during a call and kept after it."""
+    transient = retained = 0
+    for data in corpus:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        handler(data)
+        current, peak = tracemalloc.get_traced_memory()
+        transient += peak - before
+        retained += current - before
+    return transient / len(corpus), retained / len(corpus)
+
+
+def run(names: Sequence[str], corpus: Sequence[bytes], repeat: int) -> Dict[str, Dict[str, float]]:
+    """Run benchmarks."""
+    return {name: measure(BENCHMARKS[name](), corpus, repeat) for name in names}
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Return regressions of results against a baseline."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]
+        if result["packets_per_second"] < expected["packets_per_second"] * (1 - tolerance):
+            regressions.append(
+                "{}: {:.0f} packets/s, baseline {:.0f}".format(
+                    name, result["packets_per_second"], expected["packets_per_second"]
+                )
+            )
+        for key, text in (
+            ("transient_bytes_per_packet", "allocated"),
+            ("retained_bytes_per_packet", "retained"),
+        ):
+            if key in expected and result[key] > expected[key] * (1 + tolerance) + 1:
+                regressions.append(
+                    "{}: {:.1f} bytes {} per packet, baseline {:.1f}".format(name, result[key], text, expected[key])
+                )
+    return regressions
+
+
+def main(argv: Sequence[str]) -> int:
+    """Command line entry point."""
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument("--packets", type=int, default=10000, help="corpus size")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the corpus")
+    parser.add_argument("--noise", type=float, default=0.5, help="ratio of non Govee packets")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--save", action="store_true", help="save results as baseline")
+    action.add_argument("--compare", action="store_true", help="fail on regressions")
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: {}".format(", ".join(sorted(unknown))))
+
+    # Noise devices get random addresses, so they are not configured
+    corpus = govee_corpus(args.packets, args.noise, CORPUS_MACS)
+    results = run(args.benchmarks or list(BENCHMARKS), corpus, args.repeat)
+    for name, result in results.items():
+        print(
+            "{:<22} {:>12.0f} packets/s {:>8.1f} bytes allocated/packet {:>8.1f} bytes retained/packet".format(
+                name,
+                result["packets_per_second"],
+                result["transient_bytes_per_packet"],
+                result["retained_bytes_per_packet"],
+            )
+        )
+
+    if args.save:
+        with open(args.baseline, "w") as baseline_file:
+            dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "packets": args.packets,
+                    "noise": args.noise,
+                    "results": results,
+                },
+                baseline_file,
+                indent=2,
+                sort_keys=True,
+            )
+    elif args.compare:
+        with open(args.baseline) as baseline_file:
+            baseline = load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
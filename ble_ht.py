@@ -1,13 +1,23 @@
 """Bluetooth LE Humidity/Temperature data classes."""
-from typing import List, Optional, Union
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from array import array
+from math import fsum, nan as NAN
+from threading import Lock
+from typing import Deque, List, NamedTuple, Optional, Sequence, Union
 import statistics as sts
 import logging
 
 from const import (
+    DEFAULT_MEDIAN_MODE,
+    DEFAULT_MEDIAN_WINDOW,
     DEFAULT_TEMP_RANGE_MIN,
     DEFAULT_TEMP_RANGE_MAX,
     CONF_HMIN,
     CONF_HMAX,
+    MEDIAN_MODE_APPROXIMATE,
+    MEDIAN_MODE_EXACT,
+    MEDIAN_MODE_SAMPLES,
 )
 
 # _LOGGER = logging.getLogger(__name__)
@@ -19,22 +29,273 @@ class _LOGGER:
         print(text)
 
 
-class BLE_HT_packet:
-    """Bluetooth LE Humidity/Temperature packet data."""
+def defined_values(values: Sequence[float]) -> List[float]:
+    """Values of a sample buffer, without the NaN of rejected values."""
+    return [value for value in values if value == value]
 
-    temperature: float
-    humidity: float
-    packet: str
+
+def mean_of(values: Sequence[float]) -> float:
+    """Arithmetic mean of a sample buffer, ignoring rejected values."""
+    defined = defined_values(values)
+    if not defined:
+        raise sts.StatisticsError("mean requires at least one data point")
+    return fsum(defined) / len(defined)
+
+
+class BLE_HT_running_stats:
+    """Running count, mean, variance and extremes (Welford's algorithm)."""
+
+    __slots__ = ("count", "mean", "minimum", "maximum", "_m2")
+
+    count: int
+    mean: Optional[float]
+    minimum: Optional[float]
+    maximum: Optional[float]
+    _m2: float
+
+    def __init__(self) -> None:
+        """Init."""
+        self.reset()
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Sample variance of values added."""
+        if self.count < 2:
+            return None
+        return self._m2 / (self.count - 1)
+
+    def add(self, value: float) -> None:
+        """Add a value."""
+        self.count += 1
+        if self.count == 1:
+            self.mean = self.minimum = self.maximum = value
+            return
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if value < self.minimum:
+            self.minimum = value
+        elif value > self.maximum:
+            self.maximum = value
+
+    def reset(self) -> None:
+        """Reset default values."""
+        self.count = 0
+        self.mean = None
+        self.minimum = None
+        self.maximum = None
+        self._m2 = 0.0
+
+
+class BLE_HT_window_median:
+    """Exact median over a bounded window of the latest values."""
+
+    __slots__ = ("_window", "_sorted")
+
+    _window: Deque[float]
+    _sorted: List[float]
+
+    def __init__(self, size: int) -> None:
+        """Init."""
+        self._window = deque(maxlen=size)
+        self._sorted = []
+
+    @property
+    def median(self) -> Optional[float]:
+        """Median of the values in the window."""
+        count = len(self._sorted)
+        if count == 0:
+            return None
+        mid = count // 2
+        if count % 2:
+            return self._sorted[mid]
+        return (self._sorted[mid - 1] + self._sorted[mid]) / 2
+
+    def add(self, value: float) -> None:
+        """Add a value, evicting the oldest one if the window is full."""
+        if len(self._window) == self._window.maxlen:
+            del self._sorted[bisect_left(self._sorted, self._window[0])]
+        self._window.append(value)
+        insort(self._sorted, value)
+
+    def reset(self) -> None:
+        """Reset default values."""
+        self._window.clear()
+        self._sorted.clear()
+
+
+class BLE_HT_p2_median:
+    """Approximate median in constant memory (P-square algorithm).
+
+    Jain & Chlamtac, "The P2 algorithm for dynamic calculation of quantiles
+    and histograms without storing observations", CACM 28(10), 1985.
+    """
+
+    __slots__ = ("_heights", "_positions", "_desired")
+
+    _heights: List[float]
+    _positions: List[int]
+    _desired: List[float]
+
+    # Increments of the desired marker positions for the 0.5 quantile
+    _INCREMENTS = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+    def __init__(self) -> None:
+        """Init."""
+        self.reset()
+
+    @property
+    def median(self) -> Optional[float]:
+        """Estimated median of values added."""
+        if len(self._heights) < 5:
+            if not self._heights:
+                return None
+            return sts.median(self._heights)
+        return self._heights[2]
+
+    def add(self, value: float) -> None:
+        """Add a value."""
+        q = self._heights
+        if len(q) < 5:
+            insort(q, value)
+            return
+
+        n = self._positions
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = bisect_right(q, value, 1, 4) - 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._INCREMENTS[i]
+
+        # Adjust the heights of the three middle markers if necessary
+        for i in range(1, 4):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                s = 1 if d > 0 else -1
+                height = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + s * (q[i + s] - q[i]) / (n[i + s] - n[i])
+                q[i] = height
+                n[i] += s
+
+    def reset(self) -> None:
+        """Reset default values."""
+        self._heights = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+BLE_HT_median = Union[BLE_HT_window_median, BLE_HT_p2_median]
+
+
+class BLE_HT_snapshot(NamedTuple):
+    """Statistics of the values collected by a BLE_HT_data."""
+
+    mean_temperature: Optional[float]
+    median_temperature: Optional[float]
+    mean_humidity: Optional[float]
+    median_humidity: Optional[float]
+    rssi: Optional[int]
+    battery: Optional[int]
+    data_size: int
+    last_packet: Optional[str]
+
+
+class BLE_HT_samples:
+    """Samples of a publishing period, double buffered by BLE_HT_data."""
+
+    __slots__ = (
+        "temperatures",
+        "humidities",
+        "rssi",
+        "battery",
+        "packet_count",
+        "last_packet",
+        "temp_stats",
+        "hum_stats",
+        "rssi_stats",
+        "temp_median",
+        "hum_median",
+    )
+
+    temperatures: "array[float]"
+    humidities: "array[float]"
+    rssi: "array[int]"
+    battery: Optional[int]
+    packet_count: int
+    last_packet: Optional[str]
+    temp_stats: BLE_HT_running_stats
+    hum_stats: BLE_HT_running_stats
+    rssi_stats: BLE_HT_running_stats
+    temp_median: Optional[BLE_HT_median]
+    hum_median: Optional[BLE_HT_median]
+
+    def __init__(self) -> None:
+        """Init."""
+        self.temp_stats = BLE_HT_running_stats()
+        self.hum_stats = BLE_HT_running_stats()
+        self.rssi_stats = BLE_HT_running_stats()
+        self.temp_median = self.hum_median = None
+        self.reset()
+
+    def set_median(self, mode: str, window: int) -> None:
+        """Set the median backend."""
+        if mode == MEDIAN_MODE_EXACT:
+            self.temp_median = BLE_HT_window_median(window)
+            self.hum_median = BLE_HT_window_median(window)
+        elif mode == MEDIAN_MODE_APPROXIMATE:
+            self.temp_median = BLE_HT_p2_median()
+            self.hum_median = BLE_HT_p2_median()
+        elif mode == MEDIAN_MODE_SAMPLES:
+            self.temp_median = self.hum_median = None
+        else:
+            raise ValueError("Unknown median mode: {}".format(mode))
+
+    def reset(self) -> None:
+        """Reset default values."""
+        self.temperatures = array("d")
+        self.humidities = array("d")
+        self.rssi = array("i")
+        self.battery = None
+        self.packet_count = 0
+        self.last_packet = None
+        self.temp_stats.reset()
+        self.hum_stats.reset()
+        self.rssi_stats.reset()
+        if self.temp_median is not None:
+            self.temp_median.reset()
+        if self.hum_median is not None:
+            self.hum_median.reset()
 
 
 class BLE_HT_data:
-    """Bluetooth LE Humidity/Temperature data."""
+    """Bluetooth LE Humidity/Temperature data.
+
+    Samples are written to an active buffer.  publish() swaps it with a
+    spare one under a short lock, then reduces the frozen buffer while the
+    scanner keeps writing, so no sample is lost between the statistics
+    and the reset of a period.
+    """
 
     _desc: Optional[str]
     _mac: str
-    _rssi: List[int]
-    _battery: Optional[int]
-    _packet_data: List[BLE_HT_packet]
+    _active: BLE_HT_samples
+    _spare: BLE_HT_samples
+    _lock: Lock
+    _streaming: bool
+    _median_mode: str
+    _median_window: int
+    _snapshot: Optional[BLE_HT_snapshot]
     _decimal_places: Optional[int]
     _log_spikes: bool
     _min_temp: float
@@ -47,19 +308,23 @@ class BLE_HT_data:
         self._log_spikes = False
         self._min_temp = DEFAULT_TEMP_RANGE_MIN
         self._max_temp = DEFAULT_TEMP_RANGE_MAX
+        self._streaming = False
+        self._active = BLE_HT_samples()
+        self._spare = BLE_HT_samples()
+        self._lock = Lock()
+        self._median_window = DEFAULT_MEDIAN_WINDOW
+        self.median_mode = DEFAULT_MEDIAN_MODE
         self.reset()
 
     @property
     def data_size(self) -> int:
         """Packet data length."""
-        return len(self._packet_data)
+        return self._active.packet_count
 
     @property
     def last_packet(self) -> Optional[str]:
         """Return MAC address."""
-        if len(self._packet_data) == 0:
-            return None
-        return self._packet_data[-1].packet
+        return self._active.last_packet
 
     @property
     def mac(self) -> str:
@@ -69,13 +334,15 @@ class BLE_HT_data:
     @property
     def battery(self) -> Optional[int]:
         """Return battery remaining value."""
-        return self._battery
+        return self._active.battery
 
     @battery.setter
     def battery(self, value: Optional[int]) -> None:
         """Set battery remaining value."""
         if isinstance(value, int):
-            self._battery = value
+            with self._lock:
+                self._active.battery = value
+                self._snapshot = None
 
     @property
     def decimal_places(self) -> Optional[int]:
@@ -87,6 +354,7 @@ class BLE_HT_data:
         """Set number of decimal places for rounding value."""
         if value >= 0:
             self._decimal_places = value
+            self._snapshot = None
 
     @property
     def description(self) -> Optional[str]:
@@ -109,19 +377,73 @@ class BLE_HT_data:
         """Set number of decimal places for rounding value."""
         self._log_spikes = value
 
+    @property
+    def streaming(self) -> bool:
+        """Aggregate values on the fly instead of storing packets."""
+        return self._streaming
+
+    @streaming.setter
+    def streaming(self, value: bool) -> None:
+        """Aggregate values on the fly instead of storing packets."""
+        self._streaming = value
+        # The median backend depends on whether samples are stored
+        self.median_mode = self._median_mode
+
+    @property
+    def median_mode(self) -> str:
+        """Median backend: all samples, bounded window or approximation."""
+        return self._median_mode
+
+    @median_mode.setter
+    def median_mode(self, value: str) -> None:
+        """Median backend: all samples, bounded window or approximation."""
+        # Without stored samples, the median of all samples is approximated
+        backend = value
+        if self._streaming and value == MEDIAN_MODE_SAMPLES:
+            backend = MEDIAN_MODE_APPROXIMATE
+        with self._lock:
+            self._active.set_median(backend, self._median_window)
+            self._spare.set_median(backend, self._median_window)
+            self._median_mode = value
+            self._snapshot = None
+
+    @property
+    def median_window(self) -> int:
+        """Number of latest values the exact median is computed over."""
+        return self._median_window
+
+    @median_window.setter
+    def median_window(self, value: int) -> None:
+        """Number of latest values the exact median is computed over."""
+        if value > 0:
+            self._median_window = value
+            self.median_mode = self._median_mode
+
+    @property
+    def temperature_stats(self) -> BLE_HT_running_stats:
+        """Running temperature statistics, maintained in streaming mode."""
+        return self._active.temp_stats
+
+    @property
+    def humidity_stats(self) -> BLE_HT_running_stats:
+        """Running humidity statistics, maintained in streaming mode."""
+        return self._active.hum_stats
+
     @property
     def rssi(self) -> Optional[int]:
         """Return RSSI value."""
-        try:
-            return round(sts.mean(self._rssi))
-        except (AssertionError, sts.StatisticsError):
-            return None
+        return self._mean_rssi(self._active)
 
     @rssi.setter
     def rssi(self, value: Optional[int]) -> None:
         """Set RSSI value."""
         if isinstance(value, int) and value < 0:
-            self._rssi.append(value)
+            with self._lock:
+                if self._streaming:
+                    self._active.rssi_stats.add(value)
+                else:
+                    self._active.rssi.append(value)
+                self._snapshot = None
 
     @property
     def maximum_temperature(self) -> float:
@@ -147,7 +469,10 @@ class BLE_HT_data:
     def mean_temperature(self) -> Union[float, None]:
         """Mean temperature of values collected."""
         try:
-            avg = sts.mean(self._map_packet_data_attrs("temperature"))
+            if self._streaming:
+                avg = self._streaming_mean(self._active.temp_stats)
+            else:
+                avg = mean_of(self._active.temperatures)
             if hasattr(self, "_decimal_places"):
                 return round(avg, self._decimal_places)
             return avg
@@ -158,7 +483,10 @@ class BLE_HT_data:
     def median_temperature(self) -> Union[float, None]:
         """Median temperature of values collected."""
         try:
-            avg = sts.median(self._map_packet_data_attrs("temperature"))
+            if self._active.temp_median is not None:
+                avg = self._estimated_median(self._active.temp_median)
+            else:
+                avg = sts.median(defined_values(self._active.temperatures))
             if hasattr(self, "_decimal_places"):
                 return round(avg, self._decimal_places)
             return avg
@@ -169,7 +497,10 @@ class BLE_HT_data:
     def mean_humidity(self) -> Union[float, None]:
         """Mean humidity of values collected."""
         try:
-            avg = sts.mean(self._map_packet_data_attrs("humidity"))
+            if self._streaming:
+                avg = self._streaming_mean(self._active.hum_stats)
+            else:
+                avg = mean_of(self._active.humidities)
             if hasattr(self, "_decimal_places"):
                 return round(avg, self._decimal_places)
             return avg
@@ -180,7 +511,10 @@ class BLE_HT_data:
     def median_humidity(self) -> Union[float, None]:
         """Median humidity of values collected."""
         try:
-            avg = sts.median(self._map_packet_data_attrs("humidity"))
+            if self._active.hum_median is not None:
+                avg = self._estimated_median(self._active.hum_median)
+            else:
+                avg = sts.median(defined_values(self._active.humidities))
             if hasattr(self, "_decimal_places"):
                 return round(avg, self._decimal_places)
             return avg
@@ -194,35 +528,133 @@ class BLE_HT_data:
         packet: Optional[Union[int, str]],
     ) -> None:
         """Update packet data."""
-        new_packet = BLE_HT_packet()
+        # Rejected values are stored as NaN to keep the sample buffers parallel
+        temp = hum = NAN
 
         # Check if temperature within bounds
         if temperature is not None and self._max_temp >= temperature >= self._min_temp:
-            new_packet.temperature = temperature
+            temp = float(temperature)
         elif self._log_spikes:
             err = "Temperature spike: {} ({})".format(temperature, self._mac)
             _LOGGER.error(err)
 
         # Check if humidity within bounds
         if humidity is not None and CONF_HMAX >= humidity >= CONF_HMIN:
-            new_packet.humidity = humidity
+            hum = float(humidity)
         elif self._log_spikes:
             err = "Humidity spike: {} ({})".format(humidity, self._mac)
             _LOGGER.error(err)
 
-        new_packet.packet = str(packet)
-        self._packet_data.append(new_packet)
+        with self._lock:
+            samples = self._active
+            if temp == temp:
+                if samples.temp_median is not None:
+                    samples.temp_median.add(temp)
+                if self._streaming:
+                    samples.temp_stats.add(temp)
+            if hum == hum:
+                if samples.hum_median is not None:
+                    samples.hum_median.add(hum)
+                if self._streaming:
+                    samples.hum_stats.add(hum)
+            if not self._streaming:
+                samples.temperatures.append(temp)
+                samples.humidities.append(hum)
+            samples.last_packet = str(packet)
+            samples.packet_count += 1
+            self._snapshot = None
 
     def reset(self) -> None:
         """Reset default values."""
-        self._battery = None
-        self._rssi = []
-        self._packet_data = []
-
-    def _map_packet_data_attrs(self, attr: str) -> List[float]:
-        """Map defined values from _packet.data."""
-        mapped_vals = []
-        for datum in self._packet_data:
-            if hasattr(datum, attr):
-                mapped_vals.append(float(getattr(datum, attr)))
-        return mapped_vals
+        with self._lock:
+            self._active.reset()
+            self._snapshot = None
+
+    def snapshot(self) -> BLE_HT_snapshot:
+        """Return all statistics of values collected so far.
+
+        The result is cached until the next update() or reset().  While
+        samples are received, use publish() instead.
+        """
+        if self._snapshot is None:
+            self._snapshot = self._reduce(self._active)
+        return self._snapshot
+
+    def publish(self) -> BLE_HT_snapshot:
+        """Return all statistics of the period and start a new one."""
+        with self._lock:
+            frozen = self._active
+            self._active = self._spare
+            self._snapshot = None
+        try:
+            return self._reduce(frozen)
+        finally:
+            # Ready for the next swap, the scanner no longer writes to it
+            frozen.reset()
+            self._spare = frozen
+
+    def _reduce(self, samples: BLE_HT_samples) -> BLE_HT_snapshot:
+        """Statistics of a sample buffer, walked once per measurement."""
+        if self._streaming:
+            temps: List[float] = []
+            hums: List[float] = []
+            temp_mean = samples.temp_stats.mean
+            hum_mean = samples.hum_stats.mean
+        else:
+            temps = defined_values(samples.temperatures)
+            hums = defined_values(samples.humidities)
+            temp_mean = fsum(temps) / len(temps) if temps else None
+            hum_mean = fsum(hums) / len(hums) if hums else None
+
+        if samples.temp_median is not None:
+            temp_median = samples.temp_median.median
+        else:
+            temp_median = sts.median(temps) if temps else None
+        if samples.hum_median is not None:
+            hum_median = samples.hum_median.median
+        else:
+            hum_median = sts.median(hums) if hums else None
+
+        return BLE_HT_snapshot(
+            self._rounded(temp_mean),
+            self._rounded(temp_median),
+            self._rounded(hum_mean),
+            self._rounded(hum_median),
+            self._mean_rssi(samples),
+            samples.battery,
+            samples.packet_count,
+            samples.last_packet,
+        )
+
+    def _rounded(self, value: Optional[float]) -> Optional[float]:
+        """Round value to the configured number of decimal places."""
+        if value is None or not hasattr(self, "_decimal_places"):
+            return value
+        return round(value, self._decimal_places)
+
+    @staticmethod
+    def _mean_rssi(samples: BLE_HT_samples) -> Optional[int]:
+        """Mean RSSI of a sample buffer, stored or aggregated in streaming mode."""
+        stats = samples.rssi_stats
+        count = len(samples.rssi) + stats.count
+        if not count:
+            return None
+        total = sum(samples.rssi)
+        if stats.count:
+            total += stats.mean * stats.count
+        return round(total / count)
+
+    @staticmethod
+    def _streaming_mean(stats: BLE_HT_running_stats) -> float:
+        """Mean of running statistics."""
+        if stats.mean is None:
+            raise sts.StatisticsError("mean requires at least one data point")
+        return stats.mean
+
+    @staticmethod
+    def _estimated_median(estimator: BLE_HT_median) -> float:
+        """Median of a median estimator."""
+        median = estimator.median
+        if median is None:
+            raise sts.StatisticsError("no median for empty data")
+        return median
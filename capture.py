@@ -0,0 +1,162 @@
+"""Recording and deterministic replay of HCI traffic in btsnoop format."""
+from struct import Struct
+from threading import Event, Lock, Thread
+from time import monotonic, time
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple, Union
+import logging
+
+from hci import HCIMetaEvent, decode_meta_event, encode_meta_event
+
+_LOGGER = logging.getLogger(__name__)
+
+BTSNOOP_MAGIC = b"btsnoop\0"
+BTSNOOP_VERSION = 1
+BTSNOOP_DATALINK_H4 = 1002
+
+# Microseconds between 0000-01-01 and the Unix epoch
+BTSNOOP_EPOCH_DELTA = 0x00DCDDB30F2F8000
+
+# Packet flags
+BTSNOOP_FLAG_RECEIVED = 0x01
+BTSNOOP_FLAG_COMMAND_EVENT = 0x02
+
+_HEADER = Struct(">8sII")  # magic, version, datalink
+_RECORD = Struct(">IIIIq")  # original/included length, flags, drops, timestamp
+
+
+class BtsnoopWriter:
+    """Write HCI packets to a btsnoop file (H4 datalink)."""
+
+    _file: BinaryIO
+
+    def __init__(self, path: str) -> None:
+        """Init."""
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(BTSNOOP_MAGIC, BTSNOOP_VERSION, BTSNOOP_DATALINK_H4))
+        self._lock = Lock()
+
+    def write(
+        self,
+        packet: bytes,
+        timestamp: Optional[float] = None,
+        flags: int = BTSNOOP_FLAG_RECEIVED | BTSNOOP_FLAG_COMMAND_EVENT,
+    ) -> None:
+        """Write an H4 packet, timestamp defaults to now (Unix time)."""
+        if timestamp is None:
+            timestamp = time()
+        record = _RECORD.pack(
+            len(packet), len(packet), flags, 0, int(timestamp * 1000000) + BTSNOOP_EPOCH_DELTA
+        )
+        with self._lock:
+            self._file.write(record)
+            self._file.write(packet)
+
+    def write_meta_event(
+        self, subevent_code: int, data: Union[bytes, memoryview], timestamp: Optional[float] = None
+    ) -> None:
+        """Write a received LE meta event."""
+        self.write(encode_meta_event(subevent_code, data), timestamp)
+
+    def close(self) -> None:
+        """Close the file."""
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "BtsnoopWriter":
+        """Enter context."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Exit context."""
+        self.close()
+
+
+def read_btsnoop(path: str) -> Iterator[Tuple[float, bytes]]:
+    """Iterate over the (Unix timestamp, H4 packet) records of a btsnoop file."""
+    with open(path, "rb") as capture:
+        magic, _, datalink = _HEADER.unpack(capture.read(_HEADER.size))
+        if magic != BTSNOOP_MAGIC or datalink != BTSNOOP_DATALINK_H4:
+            raise ValueError("Not an H4 btsnoop file: {}".format(path))
+        while True:
+            header = capture.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return
+            _, length, _, _, timestamp = _RECORD.unpack(header)
+            packet = capture.read(length)
+            if len(packet) < length:
+                return
+            yield (timestamp - BTSNOOP_EPOCH_DELTA) / 1000000, packet
+
+
+def replay(
+    path: str,
+    handler: Callable[[HCIMetaEvent], None],
+    speed: float = 1.0,
+    stop: Optional[Event] = None,
+) -> int:
+    """Feed the LE meta events of a btsnoop file to handler.
+
+    Events are fed at their original pace divided by speed, or as fast as
+    possible if speed is 0.  Returns the number of events fed.
+    """
+    if stop is None:
+        stop = Event()
+    count = 0
+    start = first = None
+    for timestamp, packet in read_btsnoop(path):
+        event = decode_meta_event(packet)
+        if event is None:
+            continue
+        if speed > 0:
+            if first is None:
+                start, first = monotonic(), timestamp
+            delay = (timestamp - first) / speed - (monotonic() - start)
+            if delay > 0 and stop.wait(delay):
+                break
+        if stop.is_set():
+            break
+        # Event times follow the capture, whatever the replay speed
+        handler(event._replace(timestamp=timestamp))
+        count += 1
+    return count
+
+
+class ReplayAdapter:
+    """Stand-in for a bleson adapter replaying a btsnoop capture.
+
+    Like the bleson adapter, events are delivered from a reader thread to
+    _handle_meta_event, which the owner replaces with its own handler.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0) -> None:
+        """Init."""
+        self._path = path
+        self._speed = speed
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self.events = 0
+
+    def _handle_meta_event(self, hci_packet: HCIMetaEvent) -> None:
+        """Handle LE meta events, replaced by the owner."""
+
+    def _run(self) -> None:
+        """Replay the capture."""
+        self.events = replay(
+            self._path, lambda event: self._handle_meta_event(event), self._speed, self._stop
+        )
+        _LOGGER.debug("Replayed {} events from {}".format(self.events, self._path))
+
+    def start_scanning(self) -> None:
+        """Start the replay, unless started already."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="btsnoop-replay", daemon=True)
+        self._thread.start()
+
+    def stop_scanning(self) -> None:
+        """Stop the replay."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
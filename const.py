@@ -3,31 +3,77 @@
 DOMAIN = "govee_ble_hci"
 
 # Configuration options
+CONF_ACCEPT_LIST = "accept_list"
+CONF_BLE_PROVIDER = "ble_provider"
+CONF_CAPTURE_FILE = "capture_file"
 CONF_DECIMALS = "decimals"
+CONF_DEDUP_WINDOW = "dedup_window"
 CONF_DEVICE_MAC = "mac"
 CONF_DEVICE_NAME = "name"
+CONF_FLEET_CAPACITY = "fleet_capacity"
+CONF_FLEET_ENGINE = "fleet_engine"
 CONF_GOVEE_DEVICES = "govee_devices"
 CONF_HCI_DEVICE = "hci_device"
+CONF_INGEST_BUFFER = "ingest_buffer"
+CONF_INGEST_OVERFLOW = "ingest_overflow"
 CONF_LOG_SPIKES = "log_spikes"
+CONF_MEDIAN_MODE = "median_mode"
+CONF_MEDIAN_WINDOW = "median_window"
 CONF_PERIOD = "period"
+CONF_REPEAT_WINDOW = "repeat_window"
+CONF_REPLAY_FILE = "replay_file"
+CONF_REPLAY_SPEED = "replay_speed"
 CONF_ROUNDING = "rounding"
+CONF_SCAN_BURST = "scan_burst"
+CONF_SCAN_BURST_SAMPLES = "scan_burst_samples"
+CONF_SCAN_INTERVAL = "scan_interval"
+CONF_SCAN_WINDOW = "scan_window"
+CONF_STREAMING = "streaming"
 CONF_TEMP_RANGE_MAX_CELSIUS = "temp_range_max_celsius"
 CONF_TEMP_RANGE_MIN_CELSIUS = "temp_range_min_celsius"
 CONF_USE_MEDIAN = "use_median"
+CONF_WATCHDOG_TIMEOUT = "watchdog_timeout"
 
 
 # Default values for configuration options
+DEFAULT_ACCEPT_LIST = False
+DEFAULT_BLE_PROVIDER = "bleson"
 DEFAULT_DECIMALS = 2
+DEFAULT_DEDUP_WINDOW = 0.5
+DEFAULT_FLEET_CAPACITY = 256
+DEFAULT_FLEET_ENGINE = False
 DEFAULT_HCI_DEVICE = "hci0"
+DEFAULT_INGEST_BUFFER = 0
+DEFAULT_INGEST_OVERFLOW = "drop_oldest"
 DEFAULT_LOG_SPIKES = False
+DEFAULT_MEDIAN_MODE = "samples"
+DEFAULT_MEDIAN_WINDOW = 64
 DEFAULT_PERIOD = 60
+DEFAULT_REPEAT_WINDOW = 0.0
+DEFAULT_REPLAY_SPEED = 1.0
 DEFAULT_ROUNDING = True
+DEFAULT_SCAN_BURST = False
+DEFAULT_SCAN_BURST_SAMPLES = 3
+DEFAULT_SCAN_INTERVAL = 10.0
+DEFAULT_SCAN_WINDOW = 10.0
+DEFAULT_STREAMING = False
 DEFAULT_TEMP_RANGE_MAX = 60.0
 DEFAULT_TEMP_RANGE_MIN = -20.0
 DEFAULT_USE_MEDIAN = False
+DEFAULT_WATCHDOG_TIMEOUT = 120.0
 
 """Fixed constants."""
 
 # Sensor measurement limits to exclude erroneous spikes from the results
 CONF_HMIN = 0.0
 CONF_HMAX = 99.9
+
+# Median backends: all samples of the period, exact over a bounded window of
+# the latest values, or approximate in constant memory (P-square)
+MEDIAN_MODE_SAMPLES = "samples"
+MEDIAN_MODE_EXACT = "exact"
+MEDIAN_MODE_APPROXIMATE = "approximate"
+
+# Bluetooth providers: the bleson library, or a raw HCI socket
+BLE_PROVIDER_BLESON = "bleson"
+BLE_PROVIDER_RAW = "raw"
@@ -0,0 +1,49 @@
+"""Merge advertisements heard by several Bluetooth adapters."""
+from typing import Dict, Optional, Tuple, Union
+
+# Weight of the latest RSSI in the per adapter average
+DEFAULT_RSSI_SMOOTHING = 0.2
+
+
+class AdapterDeduplicator:
+    """Count every advertisement once, whatever the number of adapters.
+
+    A report is a duplicate when the same device sent the same payload less
+    than window seconds before.  The RSSI of every report, duplicates
+    included, is averaged per device and adapter to track the adapter
+    hearing each device best.
+    """
+
+    def __init__(self, window: float, smoothing: float = DEFAULT_RSSI_SMOOTHING) -> None:
+        """Init."""
+        self._window = window
+        self._smoothing = smoothing
+        self._last: Dict[bytes, Tuple[bytes, float]] = {}  # Last accepted payload and time by address
+        self._rssi: Dict[bytes, Dict[int, float]] = {}  # Average RSSI by address and adapter
+        self.accepted = 0
+        self.duplicates = 0
+
+    def accept(
+        self, address: bytes, payload: Union[bytes, memoryview], rssi: int, source: int, timestamp: float
+    ) -> bool:
+        """Track a report, False if it is a duplicate."""
+        levels = self._rssi.get(address)
+        if levels is None:
+            levels = self._rssi[address] = {}
+        level = levels.get(source)
+        levels[source] = rssi if level is None else level + self._smoothing * (rssi - level)
+
+        last = self._last.get(address)
+        if last is not None and timestamp - last[1] < self._window and last[0] == payload:
+            self.duplicates += 1
+            return False
+        self._last[address] = (bytes(payload), timestamp)
+        self.accepted += 1
+        return True
+
+    def best_source(self, address: bytes) -> Optional[int]:
+        """Adapter with the best average RSSI for a device, None if never heard."""
+        levels = self._rssi.get(address)
+        if not levels:
+            return None
+        return max(levels, key=levels.__getitem__)
@@ -0,0 +1,140 @@
+"""Fleet wide vectorized aggregation of Bluetooth LE Humidity/Temperature data."""
+from typing import Dict, NamedTuple, Optional, Sequence
+import warnings
+
+import numpy as np  # type: ignore
+
+from const import (
+    DEFAULT_TEMP_RANGE_MIN,
+    DEFAULT_TEMP_RANGE_MAX,
+    CONF_HMIN,
+    CONF_HMAX,
+)
+
+
+class BLE_HT_fleet_stats(NamedTuple):
+    """Statistics of every device of a fleet, indexed by device slot."""
+
+    count: np.ndarray
+    mean_temperature: np.ndarray
+    median_temperature: np.ndarray
+    mean_humidity: np.ndarray
+    median_humidity: np.ndarray
+    temperature_percentiles: Dict[float, np.ndarray]
+    humidity_percentiles: Dict[float, np.ndarray]
+    temperature_spikes: np.ndarray
+    humidity_spikes: np.ndarray
+    rssi: np.ndarray
+    battery: np.ndarray
+
+
+class BLE_HT_fleet:
+    """Samples of a fleet of devices, stored in preallocated 2D ring buffers.
+
+    Each device owns a row (its slot) of capacity samples; once a row is
+    full the oldest samples are overwritten.  Raw values are stored and
+    spikes are masked out when the whole fleet is reduced.  The RSSI of
+    advertisements that are not stored as samples, such as repeated
+    payloads, is added to running sums.
+    """
+
+    def __init__(self, size: int, capacity: int) -> None:
+        """Init."""
+        self._size = size
+        self._capacity = capacity
+        self._temperatures = np.full((size, capacity), np.nan)
+        self._humidities = np.full((size, capacity), np.nan)
+        self._rssi = np.full((size, capacity), np.nan, dtype=np.float32)
+        self._rssi_sums = np.zeros(size)
+        self._rssi_counts = np.zeros(size, dtype=np.intp)
+        self._heads = np.zeros(size, dtype=np.intp)
+        self._counts = np.zeros(size, dtype=np.intp)
+        self._battery = np.full(size, -1, dtype=np.int16)
+        self._min_temp = np.full(size, DEFAULT_TEMP_RANGE_MIN)
+        self._max_temp = np.full(size, DEFAULT_TEMP_RANGE_MAX)
+
+    @property
+    def size(self) -> int:
+        """Number of device slots."""
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        """Number of samples kept per device."""
+        return self._capacity
+
+    def configure(self, slot: int, minimum_temperature: float, maximum_temperature: float) -> None:
+        """Set temperature bounds of a device, values outside are spikes."""
+        self._min_temp[slot] = minimum_temperature
+        self._max_temp[slot] = maximum_temperature
+
+    def update(
+        self,
+        slot: int,
+        temperature: Optional[float],
+        humidity: Optional[float],
+        rssi: Optional[int],
+        battery: Optional[int],
+    ) -> None:
+        """Store a sample of a device."""
+        head = self._heads[slot]
+        self._temperatures[slot, head] = np.nan if temperature is None else temperature
+        self._humidities[slot, head] = np.nan if humidity is None else humidity
+        self._rssi[slot, head] = np.nan if rssi is None else rssi
+        self._heads[slot] = (head + 1) % self._capacity
+        self._counts[slot] += 1
+        if battery is not None:
+            self._battery[slot] = battery
+
+    def update_rssi(self, slot: int, rssi: int) -> None:
+        """Add the RSSI of an advertisement not stored as a sample."""
+        self._rssi_sums[slot] += rssi
+        self._rssi_counts[slot] += 1
+
+    def reduce(self, percentiles: Sequence[float] = ()) -> BLE_HT_fleet_stats:
+        """Compute statistics of all devices in one vectorized pass."""
+        temperatures = self._temperatures
+        humidities = self._humidities
+        with np.errstate(invalid="ignore"):
+            temp_spikes = (temperatures < self._min_temp[:, None]) | (
+                temperatures > self._max_temp[:, None]
+            )
+            hum_spikes = (humidities < CONF_HMIN) | (humidities > CONF_HMAX)
+        temperatures = np.where(temp_spikes, np.nan, temperatures)
+        humidities = np.where(hum_spikes, np.nan, humidities)
+        rssi_counts = np.count_nonzero(~np.isnan(self._rssi), axis=1) + self._rssi_counts
+        rssi_sums = np.nansum(self._rssi, axis=1) + self._rssi_sums
+
+        # Rows without any defined value reduce to NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return BLE_HT_fleet_stats(
+                np.minimum(self._counts, self._capacity),
+                np.nanmean(temperatures, axis=1),
+                np.nanmedian(temperatures, axis=1),
+                np.nanmean(humidities, axis=1),
+                np.nanmedian(humidities, axis=1),
+                {
+                    q: np.nanpercentile(temperatures, q, axis=1)
+                    for q in percentiles
+                },
+                {
+                    q: np.nanpercentile(humidities, q, axis=1)
+                    for q in percentiles
+                },
+                temp_spikes,
+                hum_spikes,
+                rssi_sums / rssi_counts,
+                self._battery.copy(),
+            )
+
+    def reset(self) -> None:
+        """Reset default values."""
+        self._temperatures.fill(np.nan)
+        self._humidities.fill(np.nan)
+        self._rssi.fill(np.nan)
+        self._rssi_sums.fill(0)
+        self._rssi_counts.fill(0)
+        self._heads.fill(0)
+        self._counts.fill(0)
+        self._battery.fill(-1)
@@ -1,22 +1,20 @@
 """Govee thermometer/hygrometer BLE advertisement parser."""
-from struct import unpack_from
-from typing import Optional
+from struct import Struct, error as struct_error, unpack_from
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union
 import logging
 
-from bleson.core.hci.constants import (  # type: ignore
-    GAP_FLAGS,
-    GAP_NAME_COMPLETE,
-    GAP_MFG_DATA,
-)
-from bleson.core.hci.type_converters import (  # type: ignore
-    rssi_from_byte,
-    hex_string,
-)
+from hci import GAP_FLAGS, GAP_MFG_DATA, GAP_NAME_COMPLETE
 
 ###############################################################################
 
 _LOGGER = logging.getLogger(__name__)
 
+# Precompiled unpackers for the zero-copy parser (see parse_advertisement)
+_REPORT_HEADER = Struct("<BBHIB")  # event, addr_type, addr, data length
+_MFG_PREFIX = Struct(">H")  # first two bytes of manufacturer data
+_PACKED_24 = Struct(">BHB")  # 24 bit big endian value followed by battery
+_TEMP_HUM_BATT = Struct("<hHB")  # little endian signed temp, humidity, battery
+
 
 def twos_complement(n: int, w: int = 16) -> int:
     """Two's complement integer conversion."""
@@ -46,8 +44,195 @@ def reverse_mac(rmac: bytes) -> Optional[str]:
     return (":".join(macarr)).upper()
 
 
+def address_from_mac(mac: str) -> bytes:
+    """Change Big Endian MAC string to Little Endian address bytes."""
+    return bytes(reversed(bytes.fromhex(mac.replace(":", ""))))
+
+
+class GoveeReading:
+    """Govee advertisement decoded by the zero-copy parser."""
+
+    __slots__ = (
+        "address",
+        "rssi",
+        "flags",
+        "temperature",
+        "humidity",
+        "battery",
+        "packet",
+        "model",
+    )
+
+    address: int
+    rssi: int
+    flags: int
+    temperature: Optional[float]
+    humidity: Optional[float]
+    battery: Optional[int]
+    packet: Optional[int]
+    model: Optional[str]
+
+    def __init__(self, address: int, rssi: int, flags: int) -> None:
+        """Init."""
+        self.address = address
+        self.rssi = rssi
+        self.flags = flags
+        self.temperature = None
+        self.humidity = None
+        self.battery = None
+        self.packet = None
+        self.model = None
+
+    @property
+    def mac(self) -> str:
+        """Return MAC address, formatted on demand."""
+        return ":".join(
+            format(b, "02X") for b in self.address.to_bytes(6, "big")
+        )
+
+
+# Decoder of manufacturer data at an offset: (packet, temperature, humidity, battery)
+Decoder = Callable[[memoryview, int], Tuple[int, float, float, int]]
+
+# Model name and decoder keyed on (mfg data length, flags, company/id prefix)
+_DECODERS: Dict[Tuple[int, int, Optional[int]], Tuple[str, Decoder]] = {}
+
+
+def register_decoder(
+    mfg_length: int, flags: int, prefix: Optional[int], model: str, decoder: Decoder
+) -> None:
+    """Register the decoder of a manufacturer data layout.
+
+    prefix is the first two bytes of the manufacturer data as a big endian
+    integer, or None to match any prefix not registered explicitly.
+    """
+    key = (mfg_length, flags, prefix)
+    if key in _DECODERS:
+        raise ValueError("Decoder already registered for {}".format(key))
+    _DECODERS[key] = (model, decoder)
+
+
+def packed_decoder(offset: int) -> Decoder:
+    """Build a decoder for a 24 bit packed temperature/humidity value."""
+    unpack_from = _PACKED_24.unpack_from
+
+    def decode(view: memoryview, mfg_offset: int) -> Tuple[int, float, float, int]:
+        hi, lo, batt = unpack_from(view, mfg_offset + offset)
+        packet = hi << 16 | lo
+        return packet, decode_temps(packet), float((packet % 1000) / 10), batt
+
+    return decode
+
+
+def centi_decoder(offset: int) -> Decoder:
+    """Build a decoder for little endian temperature/humidity in hundredths."""
+    unpack_from = _TEMP_HUM_BATT.unpack_from
+
+    def decode(view: memoryview, mfg_offset: int) -> Tuple[int, float, float, int]:
+        temp, hum, batt = unpack_from(view, mfg_offset + offset)
+        # Negative temperature stored as two's complement
+        return (temp & 0xFFFF) << 16 | hum, float(temp / 100.0), float(hum / 100.0), batt
+
+    return decode
+
+
+register_decoder(8, 5, 0x88EC, "Govee H5072/H5075", packed_decoder(3))
+register_decoder(8, 5, 0x0100, "Govee H5101/H5102", packed_decoder(4))
+register_decoder(11, 6, 0x0188, "Govee H5179", centi_decoder(6))
+register_decoder(9, 6, None, "Govee H5074/H5051", centi_decoder(3))
+register_decoder(11, 6, None, "Govee H5074/H5051", centi_decoder(3))
+
+
+def iter_advertising_reports(data: Union[bytes, bytearray, memoryview]) -> Iterator[memoryview]:
+    """Split an LE advertising report event into its individual reports.
+
+    data starts with the number of reports, followed by the reports laid out
+    one after the other (as read by the Linux kernel): event type, address
+    type, address, data length, advertising data and RSSI.  Each report is
+    yielded as a memoryview slice of data; iteration stops at the first
+    truncated report.
+    """
+    view = memoryview(data)
+    size = len(view)
+    if size == 0:
+        return
+    pos = 1
+    for _ in range(view[0]):
+        header_end = pos + _REPORT_HEADER.size
+        if header_end > size:
+            return
+        end = header_end + view[header_end - 1] + 1
+        if end > size:
+            return
+        yield view[pos:end]
+        pos = end
+
+
+def parse_report(report: memoryview) -> Optional[GoveeReading]:
+    """Parse a single LE advertising report without copying it.
+
+    Fast path equivalent of GoveeAdvertisement: the report is walked through a
+    memoryview with precompiled unpackers, and no debug strings, payload
+    slices or name are built.  The model is resolved from the registered
+    decoders.  Returns None if the report is truncated.
+    """
+    end = len(report) - 1
+    if end < _REPORT_HEADER.size:
+        return None
+    try:
+        _, _, addr_lo, addr_hi, _ = _REPORT_HEADER.unpack_from(report)
+        rssi = report[end]
+        reading = GoveeReading(
+            addr_hi << 16 | addr_lo, rssi - 256 if rssi > 127 else rssi, 6
+        )
+
+        mfg_offset = mfg_length = 0
+        pos = _REPORT_HEADER.size
+        while pos < end:
+            length = report[pos]
+            gap_type = report[pos + 1]
+            if GAP_FLAGS == gap_type:
+                reading.flags = report[pos + 2]
+            elif GAP_MFG_DATA == gap_type:
+                mfg_offset = pos + 2
+                mfg_length = length - 1
+            pos += length + 1
+
+        if mfg_length >= 2:
+            prefix = _MFG_PREFIX.unpack_from(report, mfg_offset)[0]
+            entry = _DECODERS.get((mfg_length, reading.flags, prefix))
+            if entry is None:
+                entry = _DECODERS.get((mfg_length, reading.flags, None))
+            if entry is not None:
+                reading.model = entry[0]
+                (
+                    reading.packet,
+                    reading.temperature,
+                    reading.humidity,
+                    reading.battery,
+                ) = entry[1](report, mfg_offset)
+    except (ValueError, IndexError, struct_error):
+        return None
+    return reading
+
+
+def parse_advertisement(data: Union[bytes, bytearray, memoryview]) -> Optional[GoveeReading]:
+    """Parse the first report of an LE advertising report event.
+
+    See iter_advertising_reports and parse_report for events carrying
+    several reports.  Returns None if the event carries no complete report.
+    """
+    report = next(iter_advertising_reports(data), None)
+    if report is None:
+        return None
+    return parse_report(report)
+
+
 class GoveeAdvertisement:
-    """Govee thermometer/hygrometer BLE sensor advertisement parser class."""
+    """Govee thermometer/hygrometer BLE sensor advertisement parser class.
+
+    Reference implementation, see parse_advertisement for the fast path.
+    """
 
     name: Optional[str]
     mfg_data: bytes
@@ -63,7 +248,7 @@ class GoveeAdvertisement:
         try:
             self._address = data[3:9]
             self.mac = reverse_mac(self._address)
-            self.rssi = rssi_from_byte(data[-1])
+            self.rssi = twos_complement(data[-1], 8)
             self.raw_data = data[10:-1]
             self.flags = 6
             self.name = None
@@ -83,7 +268,7 @@ class GoveeAdvertisement:
                 payload = data[payload_offset:payload_end]
                 _LOGGER.debug(
                     "Pos={} Type=0x{:02x} Len={} Payload={}".format(
-                        pos, gap_type, length, hex_string(payload)
+                        pos, gap_type, length, payload.hex(" ")
                     )
                 )
                 if GAP_FLAGS == gap_type:
@@ -100,14 +285,14 @@ class GoveeAdvertisement:
                 pos += length + 1
 
             if self.check_is_gvh5075_gvh5072():
-                mfg_data_5075 = hex_string(self.mfg_data[3:6]).replace(" ", "")
+                mfg_data_5075 = self.mfg_data[3:6].hex()
                 self.packet = int(mfg_data_5075, 16)
                 self.temperature = decode_temps(self.packet)
                 self.humidity = float((self.packet % 1000) / 10)
                 self.battery = int(self.mfg_data[6])
                 self.model = "Govee H5072/H5075"
             elif self.check_is_gvh5102():
-                mfg_data_5075 = hex_string(self.mfg_data[4:7]).replace(" ", "")
+                mfg_data_5075 = self.mfg_data[4:7].hex()
                 self.packet = int(mfg_data_5075, 16)
                 self.temperature = decode_temps(self.packet)
                 self.humidity = float((self.packet % 1000) / 10)
@@ -165,5 +350,5 @@ class GoveeAdvertisement:
         return (
             hasattr(self, "mfg_data")
             and len(self.mfg_data) > 2
-            and hex_string(self.mfg_data[0:2]).replace(" ", "") == id
+            and self.mfg_data[0:2].hex() == id
         )
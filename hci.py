@@ -0,0 +1,374 @@
+"""Minimal HCI packet framing and raw sockets for Bluetooth LE scanning."""
+from abc import ABC, abstractmethod
+from struct import Struct
+from threading import Event, Thread
+from time import monotonic
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Union
+import logging
+import socket
+
+_LOGGER = logging.getLogger(__name__)
+
+# HCI packet indicators (H4 transport)
+HCI_COMMAND_PKT = 0x01
+HCI_EVENT_PKT = 0x04
+
+# HCI events
+EVT_LE_META_EVENT = 0x3E
+
+EVT_CMD_COMPLETE = 0x0E
+EVT_CMD_STATUS = 0x0F
+
+# Advertising data types
+GAP_FLAGS = 0x01
+GAP_NAME_COMPLETE = 0x09
+GAP_MFG_DATA = 0xFF
+
+# LE meta subevents
+EVT_LE_ADVERTISING_REPORT = 0x02
+
+# Controller and baseband commands
+OGF_HOST_CTL = 0x03
+OCF_RESET = 0x0003
+
+# LE controller commands
+OGF_LE_CTL = 0x08
+OCF_LE_SET_SCAN_PARAMETERS = 0x000B
+OCF_LE_SET_SCAN_ENABLE = 0x000C
+OCF_LE_READ_ACCEPT_LIST_SIZE = 0x000F
+OCF_LE_CLEAR_ACCEPT_LIST = 0x0010
+OCF_LE_ADD_DEVICE_TO_ACCEPT_LIST = 0x0011
+
+# Scanning filter policies
+SCAN_FILTER_ACCEPT_ALL = 0x00
+SCAN_FILTER_ACCEPT_LIST = 0x01
+
+# Advertiser address types
+ADDRESS_TYPE_PUBLIC = 0x00
+ADDRESS_TYPE_RANDOM = 0x01
+
+# Seconds to wait for the completion of a command
+DEFAULT_COMMAND_TIMEOUT = 2.0
+
+# LE scan types
+LE_SCAN_PASSIVE = 0x00
+LE_SCAN_ACTIVE = 0x01
+
+# Scan interval and window, in units of 0.625 ms
+DEFAULT_SCAN_INTERVAL = 0x0010
+DEFAULT_SCAN_WINDOW = 0x0010
+
+# Largest H4 event packet: indicator, event code, length and parameters
+HCI_MAX_EVENT_SIZE = 258
+
+# Linux Bluetooth socket options (see bluetooth/hci.h)
+BTPROTO_HCI = 1
+SOL_HCI = 0
+HCI_FILTER = 2
+
+_COMMAND_HEADER = Struct("<BHB")  # packet indicator, opcode, parameter length
+_OPCODE = Struct("<H")
+_SCAN_PARAMETERS = Struct("<BHHBB")  # type, interval, window, own address type, filter policy
+_FILTER = Struct("<IIIH")  # packet type mask, event mask, opcode
+
+
+class HCIMetaEvent(NamedTuple):
+    """LE meta event, as handed to govee_sensor.handle_meta_event."""
+
+    subevent_code: int
+    data: Union[bytes, memoryview]
+    timestamp: Optional[float] = None  # Capture time of replayed events, None when live
+
+
+def encode_meta_event(subevent_code: int, data: Union[bytes, memoryview]) -> bytes:
+    """Encode an LE meta event as an H4 HCI event packet."""
+    return bytes((HCI_EVENT_PKT, EVT_LE_META_EVENT, len(data) + 1, subevent_code)) + bytes(data)
+
+
+def decode_meta_event(packet: Union[bytes, memoryview]) -> Optional[HCIMetaEvent]:
+    """Decode an H4 HCI event packet, None if it is not an LE meta event."""
+    if (
+        len(packet) < 4
+        or packet[0] != HCI_EVENT_PKT
+        or packet[1] != EVT_LE_META_EVENT
+        or len(packet) < packet[2] + 3
+    ):
+        return None
+    return HCIMetaEvent(packet[3], packet[4 : packet[2] + 3])
+
+
+def encode_command(ogf: int, ocf: int, parameters: bytes = b"") -> bytes:
+    """Encode an H4 HCI command packet."""
+    return _COMMAND_HEADER.pack(HCI_COMMAND_PKT, ogf << 10 | ocf, len(parameters)) + parameters
+
+
+def le_set_scan_parameters(
+    scan_type: int = LE_SCAN_ACTIVE,
+    interval: int = DEFAULT_SCAN_INTERVAL,
+    window: int = DEFAULT_SCAN_WINDOW,
+    own_address_type: int = 0,
+    filter_policy: int = 0,
+) -> bytes:
+    """LE Set Scan Parameters command."""
+    return encode_command(
+        OGF_LE_CTL,
+        OCF_LE_SET_SCAN_PARAMETERS,
+        _SCAN_PARAMETERS.pack(scan_type, interval, window, own_address_type, filter_policy),
+    )
+
+
+def le_set_scan_enable(enable: bool, filter_duplicates: bool = False) -> bytes:
+    """LE Set Scan Enable command."""
+    return encode_command(
+        OGF_LE_CTL, OCF_LE_SET_SCAN_ENABLE, bytes((int(enable), int(filter_duplicates)))
+    )
+
+
+class HCICommandSink(ABC):
+    """Interface of objects issuing HCI commands, such as RawHCIAdapter."""
+
+    @abstractmethod
+    def command(self, ogf: int, ocf: int, parameters: bytes = b"") -> bytes:
+        """Issue a command, return its return parameters (status first)."""
+
+
+def program_accept_list(sink: HCICommandSink, addresses: Sequence[bytes]) -> bool:
+    """Load little endian addresses in the controller's filter accept list.
+
+    Sensors use public or random static addresses, which cannot be told
+    apart from the address alone, so every address is added with both
+    types.  Returns False, leaving filtering to software, if the list is
+    too small or the controller refuses a command.  Scanning must be
+    disabled.
+    """
+    entries = [
+        bytes((address_type,)) + address
+        for address in addresses
+        for address_type in (ADDRESS_TYPE_PUBLIC, ADDRESS_TYPE_RANDOM)
+    ]
+    try:
+        result = sink.command(OGF_LE_CTL, OCF_LE_READ_ACCEPT_LIST_SIZE)
+        if len(result) < 2 or result[0]:
+            _LOGGER.debug("Accept list size not available, status {}".format(result[:1].hex()))
+            return False
+        if len(entries) > result[1]:
+            _LOGGER.debug("{} devices do not fit an accept list of {}".format(len(addresses), result[1]))
+            return False
+        if sink.command(OGF_LE_CTL, OCF_LE_CLEAR_ACCEPT_LIST)[:1] != b"\0":
+            return False
+        for entry in entries:
+            result = sink.command(OGF_LE_CTL, OCF_LE_ADD_DEVICE_TO_ACCEPT_LIST, entry)
+            if result[:1] != b"\0":
+                _LOGGER.debug(
+                    "Accept list refused {} (type {}), status {}".format(
+                        entry[1:][::-1].hex(), entry[0], result[:1].hex()
+                    )
+                )
+                sink.command(OGF_LE_CTL, OCF_LE_CLEAR_ACCEPT_LIST)
+                return False
+    except OSError as error:
+        _LOGGER.debug("Error programming accept list: {}".format(error))
+        return False
+    return True
+
+
+def scan_units(milliseconds: float) -> int:
+    """Scan interval or window in units of 0.625 ms."""
+    units = round(milliseconds / 0.625)
+    if not 0x0004 <= units <= 0x4000:
+        raise ValueError("Scan interval or window out of range: {} ms".format(milliseconds))
+    return units
+
+
+def event_filter(*events: int) -> bytes:
+    """HCI socket filter passing the given events only."""
+    mask = 0
+    for event in events:
+        mask |= 1 << event
+    return _FILTER.pack(1 << HCI_EVENT_PKT, mask & 0xFFFFFFFF, mask >> 32, 0)
+
+
+def adapter_names(value: Union[str, List[str]]) -> List[str]:
+    """HCI device names of a single name, a list or comma separated names."""
+    if isinstance(value, str):
+        value = value.split(",")
+    return [name.strip() for name in value if name.strip()]
+
+
+def hci_device_id(name: str) -> int:
+    """Index of an HCI device name such as hci0 or hci12."""
+    if not name.startswith("hci") or not name[3:].isdigit():
+        raise ValueError("Invalid HCI device: {}".format(name))
+    return int(name[3:])
+
+
+def open_hci_socket(device_id: int, events: Iterable[int] = (EVT_LE_META_EVENT,)) -> socket.socket:
+    """Open a raw HCI socket receiving the given events only."""
+    sock = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_RAW, BTPROTO_HCI)  # type: ignore[attr-defined]
+    try:
+        sock.setsockopt(SOL_HCI, HCI_FILTER, event_filter(*events))
+        sock.bind((device_id,))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class RawHCIAdapter(HCICommandSink):
+    """Scanning adapter on a raw HCI socket, a stand-in for the bleson adapter.
+
+    Events are received with recv_into in a reused buffer by a reader
+    thread and delivered to _handle_meta_event, which the owner replaces
+    with its own handler.  The event data is only valid during the call.
+
+    Given an accept list of addresses, the controller drops advertisements
+    of other devices, unless the accept list cannot be programmed or its
+    filter policy is refused.
+    """
+
+    def __init__(
+        self,
+        device_id: int,
+        sock: Optional[socket.socket] = None,
+        scan_type: int = LE_SCAN_ACTIVE,
+        interval: int = DEFAULT_SCAN_INTERVAL,
+        window: int = DEFAULT_SCAN_WINDOW,
+        accept_list: Optional[Sequence[bytes]] = None,
+    ) -> None:
+        """Init, sock replaces the HCI socket of the device."""
+        self.device_id = device_id
+        self._sock = sock
+        self._owns_socket = sock is None
+        self._scan_type = scan_type
+        self._interval = interval
+        self._window = window
+        self._accept_list = accept_list
+        self.accept_list_active: Optional[bool] = None  # Unknown until scanning starts
+        self._buffer = bytearray(HCI_MAX_EVENT_SIZE)
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self.events = 0
+
+    def _handle_meta_event(self, hci_packet: HCIMetaEvent) -> None:
+        """Handle LE meta events, replaced by the owner."""
+
+    def command(self, ogf: int, ocf: int, parameters: bytes = b"", timeout: float = DEFAULT_COMMAND_TIMEOUT) -> bytes:
+        """Issue a command and wait for its completion, only while not scanning."""
+        opcode = _OPCODE.pack(ogf << 10 | ocf)
+        view = memoryview(self._buffer)
+        self._sock.send(encode_command(ogf, ocf, parameters))
+        deadline = monotonic() + timeout
+        while True:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                raise TimeoutError("No completion of command {} on hci{}".format(opcode[::-1].hex(), self.device_id))
+            self._sock.settimeout(remaining)
+            size = self._sock.recv_into(self._buffer)
+            if size < 7 or view[0] != HCI_EVENT_PKT:
+                continue
+            if view[1] == EVT_CMD_COMPLETE and view[4:6] == opcode:
+                return bytes(view[6 : min(size, view[2] + 3)])
+            if view[1] == EVT_CMD_STATUS and view[5:7] == opcode and view[3]:
+                # Refused before execution
+                return bytes(view[3:4])
+
+    def _run(self) -> None:
+        """Read events until stopped."""
+        buffer = self._buffer
+        view = memoryview(buffer)
+        while not self._stop.is_set():
+            try:
+                size = self._sock.recv_into(buffer)
+            except socket.timeout:
+                continue
+            except OSError as error:
+                if not self._stop.is_set():
+                    _LOGGER.error("Error reading hci{}: {}".format(self.device_id, error))
+                return
+            if not size:
+                return
+            event = decode_meta_event(view[:size])
+            if event is not None:
+                self.events += 1
+                self._handle_meta_event(event)
+
+    def start_scanning(self) -> None:
+        """Configure and enable scanning, unless scanning already."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if self._sock is None:
+            self._sock = open_hci_socket(self.device_id, (EVT_LE_META_EVENT, EVT_CMD_COMPLETE, EVT_CMD_STATUS))
+        # A controller still scanning refuses new scan parameters
+        self._sock.send(le_set_scan_enable(False))
+        if self._accept_list is not None and self.accept_list_active is None:
+            self.accept_list_active = program_accept_list(self, self._accept_list)
+            if not self.accept_list_active:
+                _LOGGER.debug("Filtering advertisements of hci{} in software".format(self.device_id))
+        if self.accept_list_active:
+            # The controller may support the accept list but not its filter policy
+            parameters = _SCAN_PARAMETERS.pack(
+                self._scan_type, self._interval, self._window, 0, SCAN_FILTER_ACCEPT_LIST
+            )
+            try:
+                status = self.command(OGF_LE_CTL, OCF_LE_SET_SCAN_PARAMETERS, parameters)[:1]
+            except OSError as error:
+                status = b""
+                _LOGGER.debug("Error setting scan parameters on hci{}: {}".format(self.device_id, error))
+            if status != b"\0":
+                _LOGGER.debug(
+                    "Accept list filter policy refused by hci{}, status {}, filtering in software".format(
+                        self.device_id, status.hex()
+                    )
+                )
+                self.accept_list_active = False
+        if not self.accept_list_active:
+            self._sock.send(le_set_scan_parameters(self._scan_type, self._interval, self._window))
+        # Wake up the reader regularly to check for stop requests
+        self._sock.settimeout(0.5)
+        self._sock.send(le_set_scan_enable(True))
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="hci{}-reader".format(self.device_id), daemon=True)
+        self._thread.start()
+
+    def stop_scanning(self) -> None:
+        """Disable scanning and stop the reader."""
+        if self._sock is None:
+            return
+        self._stop.set()
+        try:
+            self._sock.send(le_set_scan_enable(False))
+        except OSError as error:
+            _LOGGER.debug("Error stopping scan on hci{}: {}".format(self.device_id, error))
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._owns_socket:
+            self._sock.close()
+            self._sock = None
+            # Programmed again with the next socket
+            self.accept_list_active = None
+
+    def rescan(self) -> None:
+        """Issue scan enable again, without interrupting the reader."""
+        if self._sock is None:
+            self.start_scanning()
+            return
+        self._sock.send(le_set_scan_enable(False))
+        self._sock.send(le_set_scan_enable(True))
+
+    def reopen(self) -> None:
+        """Close and open the socket again, then scan."""
+        self.stop_scanning()
+        self.start_scanning()
+
+    def reset(self) -> None:
+        """Reset the controller, then configure it and scan again."""
+        self.stop_scanning()
+        if self._sock is None:
+            self._sock = open_hci_socket(self.device_id, (EVT_LE_META_EVENT, EVT_CMD_COMPLETE, EVT_CMD_STATUS))
+        status = self.command(OGF_HOST_CTL, OCF_RESET)[:1]
+        if status != b"\0":
+            _LOGGER.error("Reset of hci{} failed, status {}".format(self.device_id, status.hex()))
+        # The reset cleared the accept list
+        self.accept_list_active = None
+        self.start_scanning()
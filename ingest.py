@@ -0,0 +1,141 @@
+"""Bounded ingestion ring buffer between the HCI reader thread and the parser."""
+from array import array
+from threading import Event, Lock
+from time import monotonic
+from typing import Callable, Optional, Union
+
+# Overflow policies
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+
+# Largest HCI event parameter length
+MAX_EVENT_SIZE = 255
+
+
+class IngestRing:
+    """Preallocated single producer ring buffer of raw HCI event data.
+
+    The producer (an HCI reader thread) only copies event bytes, a
+    monotonic timestamp and the index of its adapter into a free slot.  The consumer drains pending
+    events in batches: they are copied out in one go into a scratch buffer,
+    so the producer is never blocked while events are parsed.
+    """
+
+    def __init__(
+        self, capacity: int, overflow: str = OVERFLOW_DROP_OLDEST, slot_size: int = MAX_EVENT_SIZE
+    ) -> None:
+        """Init."""
+        if overflow not in (OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST):
+            raise ValueError("Unknown overflow policy: {}".format(overflow))
+        self._capacity = capacity
+        self._slot_size = slot_size
+        self._overflow = overflow
+        self._slots = memoryview(bytearray(capacity * slot_size))
+        self._lengths = array("H", bytes(2 * capacity))
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._sources = array("B", bytes(capacity))
+        self._batch = memoryview(bytearray(capacity * slot_size))
+        self._batch_lengths = array("H", bytes(2 * capacity))
+        self._batch_timestamps = array("d", bytes(8 * capacity))
+        self._batch_sources = array("B", bytes(capacity))
+        # Events written and read so far, their difference is the fill level
+        self._head = 0
+        self._tail = 0
+        self._lock = Lock()
+        self._drain_lock = Lock()
+        self._ready = Event()
+        self.pushed = 0
+        self.dropped = 0
+        self.oversized = 0
+        self.drained = 0
+        self.high_water = 0
+
+    @property
+    def capacity(self) -> int:
+        """Number of events the ring can hold."""
+        return self._capacity
+
+    @property
+    def overflow(self) -> str:
+        """Overflow policy."""
+        return self._overflow
+
+    def __len__(self) -> int:
+        """Number of pending events."""
+        return self._head - self._tail
+
+    def push(
+        self, data: Union[bytes, memoryview], timestamp: Optional[float] = None, source: int = 0
+    ) -> bool:
+        """Copy event data into the ring, False if it was dropped."""
+        length = len(data)
+        if length > self._slot_size:
+            self.oversized += 1
+            return False
+        if timestamp is None:
+            timestamp = monotonic()
+        with self._lock:
+            pending = self._head - self._tail
+            if pending >= self._capacity:
+                self.dropped += 1
+                if self._overflow == OVERFLOW_DROP_NEWEST:
+                    return False
+                self._tail += 1
+                pending -= 1
+            slot = self._head % self._capacity
+            offset = slot * self._slot_size
+            self._slots[offset : offset + length] = data
+            self._lengths[slot] = length
+            self._timestamps[slot] = timestamp
+            self._sources[slot] = source
+            self._head += 1
+            self.pushed += 1
+            if pending + 1 > self.high_water:
+                self.high_water = pending + 1
+        self._ready.set()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until events are pending, False on timeout."""
+        return self._ready.wait(timeout)
+
+    def drain(self, handler: Callable[[memoryview, float, int], None], max_batch: Optional[int] = None) -> int:
+        """Hand pending events to handler, oldest first.
+
+        The memoryview passed to handler is only valid during the call.
+        Returns the number of events handled.
+        """
+        with self._drain_lock:
+            size = self._slot_size
+            with self._lock:
+                count = self._head - self._tail
+                if max_batch is not None:
+                    count = min(count, max_batch)
+                if count == 0:
+                    self._ready.clear()
+                    return 0
+                start = self._tail % self._capacity
+                first = min(count, self._capacity - start)
+                self._batch[: first * size] = self._slots[start * size : (start + first) * size]
+                self._batch_lengths[:first] = self._lengths[start : start + first]
+                self._batch_timestamps[:first] = self._timestamps[start : start + first]
+                self._batch_sources[:first] = self._sources[start : start + first]
+                if count > first:
+                    rest = count - first
+                    self._batch[first * size : count * size] = self._slots[: rest * size]
+                    self._batch_lengths[first:count] = self._lengths[:rest]
+                    self._batch_timestamps[first:count] = self._timestamps[:rest]
+                    self._batch_sources[first:count] = self._sources[:rest]
+                self._tail += count
+                if self._head == self._tail:
+                    self._ready.clear()
+
+            batch = self._batch
+            lengths = self._batch_lengths
+            timestamps = self._batch_timestamps
+            sources = self._batch_sources
+            for i in range(count):
+                offset = i * size
+                handler(batch[offset : offset + lengths[i]], timestamps[i], sources[i])
+            self.drained += count
+            return count
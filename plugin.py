@@ -34,7 +34,12 @@ For more details, see [Using Python Plugins](https://www.domoticz.com/wiki/Using
         </ul>
 
         <h3>Configuration</h3>
-        Configuration options...
+        Devices are given as comma, semicolon or newline separated MAC=Name entries,
+        as JSON (a list of {"mac": ..., "name": ...} objects, or an object of names by MAC),
+        or as the path of a file holding either, relative to the plugin folder.
+        A Domoticz device is created when a sensor is first heard, and keeps its unit when the list changes.<br/>
+        Readings changing less than the temperature;humidity deadband are not written,
+        devices are then only touched before the Domoticz sensor timeout.
     </description>
 
     <params>
@@ -54,50 +59,139 @@ For more details, see [Using Python Plugins](https://www.domoticz.com/wiki/Using
                 <option label="Debug - All" value="-1"/>
             </options>
         </param>
-        <param field="Mode2" label="MAC Address #1" width="200px" required="true" default=""/>
-        <param field="Mode3" label="Name #1" width="200px" required="false" default=""/>
-        <param field="Mode4" label="MAC Address #2" width="200px" required="false" default=""/>
-        <param field="Mode5" label="Name #2" width="200px" required="false" default=""/>
-        <param field="Mode6" label="MAC Address #3" width="200px" required="false" default=""/>
-        <param field="Mode7" label="Name #3" width="200px" required="false" default=""/>
+        <param field="Mode2" label="Devices (MAC=Name, JSON or file)" width="600px" required="true" default=""/>
+        <param field="Mode3" label="Deadband (°C;%)" width="100px" required="false" default="0;0"/>
     </params>
 </plugin>
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional, Set
 import Domoticz
+import json
+import os
+import re
 from datetime import date, datetime, timedelta
 import time
 from enum import IntEnum
-from DomoticzPluginHelper import DomoticzPluginHelper
+from DomoticzPluginHelper import DomoticzPluginHelper, DomoticzDeviceTypes
+from publisher import DevicePublisher
 import sensor2
 
 z: DomoticzPluginHelper = None
 
+MacPattern = re.compile(r'^[0-9A-F]{2}(:[0-9A-F]{2}){5}$')
+
+
+def ParseDeviceList(value: str, homeFolder: str = '') -> List[Dict[str, str]]:
+    """Devices of a device list parameter, see the plugin description for the formats.
+
+    Entries are returned in order, with upper case MAC addresses, the last entry of a MAC wins.
+    Other keys of JSON objects (e.g. median_mode) are kept as per device options.
+    Unreadable lists and entries are logged and skipped."""
+    value = value.strip()
+    if value and os.path.isfile(os.path.join(homeFolder, value)):
+        try:
+            with open(os.path.join(homeFolder, value)) as f:
+                value = f.read().strip()
+        except OSError as error:
+            z.WriteLog(f"Cannot read device list '{value}': {error}")
+            return []
+
+    if value.startswith('[') or value.startswith('{'):
+        try:
+            entries = json.loads(value)
+        except ValueError as error:
+            z.WriteLog(f"Invalid JSON device list: {error}")
+            return []
+        if isinstance(entries, dict):
+            entries = [{'mac': mac, 'name': name} for mac, name in entries.items()]
+        else:
+            entries = [{'mac': x} if isinstance(x, str) else x for x in entries]
+    else:
+        entries = []
+        for entry in re.split(r'[,;\n]', value):
+            mac, _, name = entry.partition('=')
+            if mac.strip() != '':
+                entries.append({'mac': mac, 'name': name})
+
+    devices = {}
+    for x in entries:
+        if not isinstance(x, dict) or not isinstance(x.get('mac'), str):
+            z.WriteLog(f"Ignoring device list entry without MAC address: {x}")
+            continue
+        mac = x['mac'].strip().upper()
+        devices[mac] = {**x, 'mac': mac, 'name': str(x.get('name') or '').strip() or mac}
+    return list(devices.values())
+
+
+def LegacyDeviceList() -> Optional[List[Dict[str, str]]]:
+    """Devices of the former MAC/name parameter pairs (Mode2 to Mode7), None if Mode2 is a device list"""
+    if MacPattern.match(z.Parameters.Mode2.strip().upper()) is None:
+        return None
+    devices = []
+    for macMode, nameMode in (('Mode2', 'Mode3'), ('Mode4', 'Mode5'), ('Mode6', 'Mode7')):
+        mac = getattr(z.Parameters, macMode, '') or ''
+        if mac.strip() != '':
+            devices.append({'mac': mac, 'name': getattr(z.Parameters, nameMode, '') or ''})
+    return ParseDeviceList(json.dumps(devices))
+
+
 class PluginConfig:
     """Plugin configuration (singleton)"""
 
     def __init__(self):
         global z
-        self.macs = [
-            {
-                'mac': z.Parameters.Mode2,
-                'name': z.Parameters.Mode3,
-            },
-        ]
-        if z.Parameters.Mode4 is not None and z.Parameters.Mode4 != '':
-            self.macs.append({
-                'mac': z.Parameters.Mode4,
-                'name': z.Parameters.Mode5,
-            },)
-        if z.Parameters.Mode6 is not None and z.Parameters.Mode6 != '':
-            self.macs.append({
-                'mac': z.Parameters.Mode6,
-                'name': z.Parameters.Mode7,
-            },)
+        self.macs = []
+        # Installs of the former layout keep a single MAC in Mode2, names in Mode3, Mode5 and Mode7
+        devices = LegacyDeviceList()
+        self.legacy = devices is not None
+        if self.legacy:
+            z.WriteLog("Former MAC/name parameters found, consider setting the device list to: " +
+                       ", ".join(f"{x['mac']}={x['name']}" for x in devices))
+        else:
+            devices = ParseDeviceList(z.Parameters.Mode2, z.Parameters.HomeFolder)
+        for x in devices:
+            if MacPattern.match(x['mac']) is None:
+                z.WriteLog(f"Ignoring invalid MAC address '{x['mac']}'")
+                continue
+            self.macs.append(x)
+        self.names: Dict[str, str] = {x['mac']: x['name'] for x in self.macs}
+        self.deadbands = ()
+        if not self.legacy and z.Parameters.Mode3:
+            try:
+                self.deadbands = tuple(float(x) for x in z.Parameters.Mode3.split(';'))
+            except ValueError:
+                z.WriteLog(f"Invalid deadband '{z.Parameters.Mode3}', every change is written")
         for x in self.macs:
-            z.WriteLog(f"mac: {x['mac']}: {x['name']}")
-        #sensor2.setup_platform_by_macs(self.macs)
+            z.WriteLog(f"mac: {x['mac']}: {x['name']}", "Verbose")
+        z.WriteLog(f"{len(self.macs)} devices configured")
+
+
+class UnitIndex:
+    """Domoticz units by MAC address, stored in the plugin configuration so they survive list changes"""
+
+    ConfigKey = 'Units'
+    MaxUnit = 255  # Domoticz unit numbers are below 256
+
+    def __init__(self, units: Dict[str, int]):
+        self.units: Dict[str, int] = dict(units)
+        self.used: Set[int] = set(self.units.values())
+        self.nextUnit = 1  # Lowest unit which may be free
+        self.full: Set[str] = set()  # MAC addresses left without unit, logged once
+
+    def get(self, mac: str) -> Optional[int]:
+        return self.units.get(mac)
+
+    def assign(self, mac: str, taken) -> Optional[int]:
+        """Give the lowest unit neither assigned nor in taken (existing devices) to a MAC address"""
+        while self.nextUnit <= self.MaxUnit and (self.nextUnit in self.used or self.nextUnit in taken):
+            self.nextUnit += 1
+        if self.nextUnit > self.MaxUnit:
+            return None
+        unit = self.nextUnit
+        self.units[mac] = unit
+        self.used.add(unit)
+        return unit
 
 
 class DeviceUnits(IntEnum):
@@ -107,6 +201,51 @@ class DeviceUnits(IntEnum):
 class PluginDevices:
     def __init__(self):
         self.config = PluginConfig()
+        units = z.GetConfigItem(UnitIndex.ConfigKey)
+        if units is None:
+            # First start without stored units: keep the units given by position to existing
+            # devices, in the order of the former parameters for installs of the former layout
+            devices = z.Devices
+            units = {x['mac']: i for i, x in enumerate(self.config.macs, 1) if i in devices}
+            z.SetConfigItem(UnitIndex.ConfigKey, units)
+        self.units = UnitIndex(units)
+        self.readings = None  # Last readings pushed to Domoticz
+        # Touch devices skipped by the deadband well before they are shown as timed out
+        self.publisher = DevicePublisher(self.config.deadbands, int(Settings["SensorTimeout"]) * 60 / 2)
+
+    def CreateDevice(self, mac: str) -> Optional[int]:
+        """Unit of the device of a MAC address, assigned and created when first heard"""
+        unit = self.units.get(mac)
+        if unit is None:
+            unit = self.units.assign(mac, z.Devices)
+            if unit is None:
+                if mac not in self.units.full:
+                    self.units.full.add(mac)
+                    z.WriteLog(f"No free Domoticz unit for {mac}")
+                return None
+            z.SetConfigItem(UnitIndex.ConfigKey, self.units.units)
+        z.InitDevice(f'Temp-Hum {self.config.names[mac]}', unit,
+                     DeviceType=DomoticzDeviceTypes.TempHum(),
+                     Used=True,
+                     defaultNValue=0,
+                     defaultSValue="0")
+        return unit
+
+
+def HumidityStatus(humidity: float) -> int:
+    """Domoticz humidity status: 0 normal, 1 comfortable, 2 dry, 3 wet"""
+    if humidity < 30:
+        return 2
+    if humidity > 70:
+        return 3
+    if 40 <= humidity <= 60:
+        return 1
+    return 0
+
+
+def SignalLevel(rssi: int) -> int:
+    """Domoticz signal level (0-12) of a RSSI (-100 to -40 dBm)"""
+    return min(max(round((rssi + 100) / 5), 0), 12)
 
 pluginDevices: PluginDevices = None
 
@@ -133,25 +272,23 @@ def onStart():
 
     z = DomoticzPluginHelper(
         Domoticz, Settings, Parameters, Devices, Images, {})
-    z.onStart(3)
+    z.onStart(1)
 
     pluginDevices = PluginDevices()
-    TempHumDomoticzDeviceType = DomoticzDeviceTypes.TempHum()
 
-    i = 1
+    # Devices are created when first heard, existing ones are only registered
+    devices = z.Devices
     for x in pluginDevices.config.macs:
-        mac = x['mac']
-        name = x['name']
-        z.InitDevice(f'Temp-Hum {name}', i,
-                    DeviceType=TempHumDomoticzDeviceType,
-                    Used=True,
-                    defaultNValue=0,
-                    defaultSValue="0")
-        i += 1
+        if pluginDevices.units.get(x['mac']) in devices:
+            pluginDevices.CreateDevice(x['mac'])
+
+    # Scanning and aggregation run in a daemon thread, heartbeats only read its readings
+    sensor2.start_by_macs(pluginDevices.config.macs)
 
 def onStop():
     global z
     global pluginDevices
+    sensor2.stop()
     z.onStop()
 
 
@@ -165,14 +302,28 @@ def onHeartbeat():
     global z
     global pluginDevices
     z.onHeartbeat()
-    #sensor2.update_ble_loop()
-    #i = 1
-    #for x in pluginDevices.config.macs:
-    #    mac = x['mac']
-    #    name = x['name']
-    #    temp = sensor2.s.sensors_by_mac[mac][0].value
-    #    hum = sensor2.s.sensors_by_mac[mac][1].value
-    #    rssi = sensor2.s.sensors_by_mac[mac][0].rssi
-    #    battery = sensor2.s.sensors_by_mac[mac][0].battery
-    #    z.Devices[i].Update(BatteryLevel=battery * 255, SignalLevel=rssi * 255)
-    #    i += 1
+
+    # Readings are replaced once per period, push them once.  Silent sensors
+    # are left out of them, their devices are neither updated nor touched and time out
+    readings = sensor2.s.readings
+    if readings is pluginDevices.readings:
+        return
+    pluginDevices.readings = readings
+    devices = z.Devices
+    for mac, reading in readings.items():
+        if reading.temperature is None or reading.humidity is None:
+            continue
+        unit = pluginDevices.units.get(mac)
+        if unit is None or unit not in devices:
+            unit = pluginDevices.CreateDevice(mac)
+            if unit is None:
+                continue
+            devices = z.Devices
+            pluginDevices.publisher.Forget(unit)
+        pluginDevices.publisher.Publish(
+            unit, devices[unit],
+            nValue=0,
+            sValue=f"{reading.temperature};{reading.humidity};{HumidityStatus(reading.humidity)}",
+            batteryLevel=255 if reading.battery is None else reading.battery,
+            signalLevel=12 if reading.rssi is None else SignalLevel(reading.rssi),
+            values=(reading.temperature, reading.humidity))
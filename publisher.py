@@ -0,0 +1,98 @@
+"""Change detection and deadband for Domoticz device updates.
+
+Every Update writes to the Domoticz database and fires events, scripts and
+MQTT messages, so unchanged values are not written again.  Devices whose
+readings stay inside the deadband are only touched, to stay ahead of the
+Domoticz sensor timeout.
+"""
+from time import monotonic
+from typing import Dict, Optional, Sequence
+
+
+class PublishedState:
+    """Values last written to a device."""
+
+    __slots__ = ("nValue", "sValue", "batteryLevel", "signalLevel", "values", "written")
+
+    def __init__(self, nValue: int, sValue: str, batteryLevel: int, signalLevel: int,
+                 values: Sequence[Optional[float]], written: float):
+        self.nValue = nValue
+        self.sValue = sValue
+        self.batteryLevel = batteryLevel
+        self.signalLevel = signalLevel
+        self.values = tuple(values)
+        self.written = written
+
+
+class DevicePublisher:
+    """Write device values only when they changed beyond a deadband.
+
+    values are the measurements encoded in sValue (e.g. temperature and
+    humidity), compared one by one against the last written ones with the
+    matching deadbands.  Signal levels jitter with the RSSI, they are only
+    written when they moved by more than signalDeadband.  Any other change
+    (nValue, battery level) is always written.  A device skipped for
+    refreshInterval seconds is touched, updating its last seen time without
+    triggering events.  Publish must only be called with fresh readings, a
+    silent device must not be published so that Domoticz times it out.
+    """
+
+    def __init__(self, deadbands: Sequence[float] = (), refreshInterval: Optional[float] = None,
+                 signalDeadband: int = 1):
+        """Init, refreshInterval should be shorter than the Domoticz SensorTimeout."""
+        self.deadbands = tuple(deadbands)
+        self.signalDeadband = signalDeadband
+        self.refreshInterval = refreshInterval
+        self.states: Dict[int, PublishedState] = {}  # Last written values by unit
+        self.updates = 0
+        self.touches = 0
+        self.skipped = 0
+
+    def Changed(self, state: PublishedState, nValue: int, sValue: str, batteryLevel: int, signalLevel: int,
+                values: Sequence[Optional[float]]) -> bool:
+        """Whether values differ from the written ones by more than the deadbands"""
+        if state.nValue != nValue or state.batteryLevel != batteryLevel:
+            return True
+        if abs(signalLevel - state.signalLevel) > self.signalDeadband:
+            return True
+        if state.sValue == sValue:
+            return False
+        if len(values) != len(state.values):
+            return True
+        for i, (value, last) in enumerate(zip(values, state.values)):
+            if value is None or last is None:
+                if value is not last:
+                    return True
+                continue
+            deadband = self.deadbands[i] if i < len(self.deadbands) else 0.0
+            if abs(value - last) > deadband:
+                return True
+        return False
+
+    def Publish(self, unit: int, device, nValue: int, sValue: str, batteryLevel: int = 255,
+                signalLevel: int = 12, values: Sequence[Optional[float]] = (), now: Optional[float] = None) -> bool:
+        """Update, touch or skip a device, True if its values were written"""
+        if now is None:
+            now = monotonic()
+        state = self.states.get(unit)
+        if state is None or self.Changed(state, nValue, sValue, batteryLevel, signalLevel, values):
+            device.Update(nValue=nValue, sValue=sValue, BatteryLevel=batteryLevel, SignalLevel=signalLevel)
+            self.states[unit] = PublishedState(nValue, sValue, batteryLevel, signalLevel, values, now)
+            self.updates += 1
+            return True
+
+        if self.refreshInterval is not None and now - state.written >= self.refreshInterval:
+            try:
+                device.Touch()
+            except AttributeError:
+                # Domoticz versions without Touch: rewrite without triggers
+                device.Update(nValue=state.nValue, sValue=state.sValue, SuppressTriggers=True)
+            state.written = now
+            self.touches += 1
+        else:
+            self.skipped += 1
+        return False
+
+    def Forget(self, unit: int) -> None:
+        """Write the next values of a unit whatever they are, e.g. after its device was recreated"""
+        self.states.pop(unit, None)
@@ -0,0 +1,108 @@
+"""Duty-cycled scanning in bursts, sized from learned advertisement intervals."""
+from threading import Event
+from time import monotonic
+from typing import Dict, Iterable, Optional, Set
+
+# Samples of every device ending a burst
+DEFAULT_BURST_SAMPLES = 3
+
+# Weight of the latest interval in the learned advertisement intervals
+DEFAULT_INTERVAL_SMOOTHING = 0.2
+
+# Burst length relative to the time needed by the slowest device
+DEFAULT_BURST_MARGIN = 1.5
+
+
+class ScanScheduler:
+    """Scan in bursts, one per period, instead of continuously.
+
+    A burst ends as soon as every device produced samples reports, or at
+    a deadline.  Until the advertisement interval of every device is known,
+    the deadline is max_burst; it is then sized to let the slowest device
+    advertise samples times, with a margin.  Intervals are only learned
+    from consecutive reports of a burst, at least two samples are needed.
+    """
+
+    def __init__(
+        self,
+        addresses: Iterable[bytes],
+        period: float,
+        samples: int = DEFAULT_BURST_SAMPLES,
+        max_burst: Optional[float] = None,
+        margin: float = DEFAULT_BURST_MARGIN,
+        smoothing: float = DEFAULT_INTERVAL_SMOOTHING,
+    ) -> None:
+        """Init."""
+        self._addresses = tuple(addresses)
+        self._period = period
+        self._samples = samples
+        self._max_burst = period if max_burst is None else min(max_burst, period)
+        self._margin = margin
+        self._smoothing = smoothing
+        self._last_seen: Dict[bytes, float] = {}
+        self._counts: Dict[bytes, int] = {}
+        self._pending: Set[bytes] = set()
+        self._complete = Event()
+        self._burst_start = 0.0
+        self.intervals: Dict[bytes, float] = {}  # Learned advertisement intervals by address
+        self.scanning = False
+        self.bursts = 0
+        self.incomplete_bursts = 0
+        self.scan_time = 0.0
+
+    @property
+    def period(self) -> float:
+        """Seconds between the start of bursts."""
+        return self._period
+
+    def burst_duration(self) -> float:
+        """Longest duration of the next burst."""
+        if len(self.intervals) < len(self._addresses):
+            return self._max_burst
+        return min(self._samples * max(self.intervals.values()) * self._margin, self._max_burst)
+
+    def start_burst(self, now: float) -> float:
+        """Start counting samples, return the deadline of the burst."""
+        self._counts = dict.fromkeys(self._addresses, 0)
+        self._pending = set(self._addresses)
+        self._last_seen.clear()
+        self._complete.clear()
+        self._burst_start = now
+        self.scanning = True
+        self.bursts += 1
+        return now + self.burst_duration()
+
+    def stop_burst(self, now: float) -> None:
+        """Stop counting samples."""
+        self.scanning = False
+        self.scan_time += now - self._burst_start
+        if self._pending:
+            self.incomplete_bursts += 1
+
+    def observe(self, address: bytes, timestamp: float) -> None:
+        """Count a sample of a device received at timestamp (monotonic)."""
+        if not self.scanning:
+            return
+        last = self._last_seen.get(address)
+        self._last_seen[address] = timestamp
+        if last is not None and timestamp > last:
+            interval = self.intervals.get(address)
+            delta = timestamp - last
+            self.intervals[address] = delta if interval is None else interval + self._smoothing * (delta - interval)
+
+        count = self._counts.get(address)
+        if count is None:
+            return
+        self._counts[address] = count + 1
+        if count + 1 >= self._samples and address in self._pending:
+            self._pending.discard(address)
+            if not self._pending:
+                self._complete.set()
+
+    def wait(self, deadline: float) -> bool:
+        """Wait for the end of a burst, False if the deadline passed first."""
+        return self._complete.wait(max(deadline - monotonic(), 0.0))
+
+    def wake(self) -> None:
+        """End the wait for the current burst."""
+        self._complete.set()
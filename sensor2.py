@@ -1,37 +1,76 @@
 """Govee BLE monitor integration."""
 from datetime import time, timedelta
-from time import sleep
+from functools import partial
+from threading import Event, Lock, Thread
+from time import monotonic, sleep
 import logging
-from typing import List, Optional, Dict, Set, Tuple
-
-from bleson import get_provider  # type: ignore
-from bleson.core.hci.constants import EVT_LE_ADVERTISING_REPORT  # type: ignore
-from bleson.core.types import BDAddress  # type: ignore
-from bleson.core.hci.type_converters import hex_string
-from bleson.providers.linux.linux_adapter import BluetoothHCIAdapter  # type: ignore
+from typing import List, NamedTuple, Optional, Dict, Set, Tuple
 
 from const import (
+    BLE_PROVIDER_RAW,
+    CONF_ACCEPT_LIST,
+    CONF_BLE_PROVIDER,
+    CONF_CAPTURE_FILE,
     CONF_DECIMALS,
+    CONF_DEDUP_WINDOW,
+    CONF_FLEET_CAPACITY,
+    CONF_FLEET_ENGINE,
     CONF_GOVEE_DEVICES,
     CONF_HCI_DEVICE,
+    CONF_INGEST_BUFFER,
+    CONF_INGEST_OVERFLOW,
     CONF_LOG_SPIKES,
+    CONF_MEDIAN_MODE,
+    CONF_MEDIAN_WINDOW,
     CONF_PERIOD,
+    CONF_REPEAT_WINDOW,
+    CONF_REPLAY_FILE,
+    CONF_REPLAY_SPEED,
     CONF_ROUNDING,
+    CONF_SCAN_BURST,
+    CONF_SCAN_BURST_SAMPLES,
+    CONF_SCAN_INTERVAL,
+    CONF_SCAN_WINDOW,
+    CONF_STREAMING,
     CONF_TEMP_RANGE_MAX_CELSIUS,
     CONF_TEMP_RANGE_MIN_CELSIUS,
     CONF_USE_MEDIAN,
+    CONF_WATCHDOG_TIMEOUT,
+    DEFAULT_ACCEPT_LIST,
+    DEFAULT_BLE_PROVIDER,
     DEFAULT_DECIMALS,
+    DEFAULT_DEDUP_WINDOW,
+    DEFAULT_FLEET_CAPACITY,
+    DEFAULT_FLEET_ENGINE,
     DEFAULT_HCI_DEVICE,
+    DEFAULT_INGEST_BUFFER,
+    DEFAULT_INGEST_OVERFLOW,
     DEFAULT_LOG_SPIKES,
+    DEFAULT_MEDIAN_MODE,
+    DEFAULT_MEDIAN_WINDOW,
     DEFAULT_PERIOD,
+    DEFAULT_REPEAT_WINDOW,
+    DEFAULT_REPLAY_SPEED,
     DEFAULT_ROUNDING,
+    DEFAULT_SCAN_BURST,
+    DEFAULT_SCAN_BURST_SAMPLES,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SCAN_WINDOW,
+    DEFAULT_STREAMING,
     DEFAULT_TEMP_RANGE_MAX,
     DEFAULT_TEMP_RANGE_MIN,
     DEFAULT_USE_MEDIAN,
+    DEFAULT_WATCHDOG_TIMEOUT,
     DOMAIN,
 )
 
-from govee_advertisement import GoveeAdvertisement
+from capture import BtsnoopWriter, ReplayAdapter
+from dedup import AdapterDeduplicator
+from hci import EVT_LE_ADVERTISING_REPORT, RawHCIAdapter, adapter_names, hci_device_id, scan_units
+from ingest import IngestRing
+from scheduler import ScanScheduler
+from watchdog import ScanWatchdog
+from govee_advertisement import address_from_mac, iter_advertising_reports, parse_report, twos_complement
 from ble_ht import BLE_HT_data
 
 ###############################################################################
@@ -53,36 +92,163 @@ class govee_sensor:
         _LOGGER.debug("Starting Govee HCI Sensor")
         self.govee_devices: List[BLE_HT_data] = []  # Data objects of configured devices
         self.sensors_by_mac: Dict[str, List[MeasurementSensor]] = {}  # HomeAssistant sensors by MAC address
-        self.adapter: BluetoothHCIAdapter = None
+        self.devices_by_address: Dict[bytes, BLE_HT_data] = {}  # Data objects by little endian address
+        self.fleet = None  # Optional NumPy store aggregating samples of all devices
+        self.fleet_slots: Dict[str, int] = {}  # Fleet store rows by MAC address
+        self.adapters: list = []  # Scanning adapters (bleson, raw HCI or replay), concurrently
+        self.adapter_names: List[str] = []
+        self.dedup: Optional[AdapterDeduplicator] = None  # Merges reports heard by several adapters
+        self.repeat_window = 0.0  # Seconds during which a repeated payload is not decoded again
+        self.last_payloads: Dict[bytes, Tuple[bytes, float]] = {}  # Last decoded payload and time by address
+        self.repeats = 0  # Repeated payloads not decoded
+        self._handle_lock = Lock()  # Reader threads of several adapters may handle events at once
+        self.recorder: Optional[BtsnoopWriter] = None  # Optional capture of received meta events
+        self.ingest: Optional[IngestRing] = None  # Optional buffer between HCI reader and parser
+        self._ingest_stop = Event()
+        self._ingest_thread: Optional[Thread] = None
+        self.scheduler: Optional[ScanScheduler] = None  # Optional scanning in bursts
+        self._scheduler_stop = Event()
+        self._scheduler_thread: Optional[Thread] = None
+        self.watchdog: Optional[ScanWatchdog] = None  # Recovers adapters which stopped delivering events
+        self.readings: Dict[str, Reading] = {}  # Readings of devices heard during the last period, by MAC address
+        self.reports: Dict[str, int] = {}  # Reports received by MAC address, repeats included
+        self._readings_reports: Dict[str, int] = {}  # Reports received when readings were last published
+        self._update_stop = Event()
+        self._update_thread: Optional[Thread] = None
 
     def setup_platform(self, config) -> None:
         self.config = config
         self.run()
 
-    def handle_meta_event(self, hci_packet) -> None:
-        """Handle received BLE data."""
+    def start(self, config) -> None:
+        """Set up and update sensors every period, in a daemon thread."""
+        self._update_stop.clear()
+        self._update_thread = Thread(
+            target=self.run_update_loop, args=(config,), name="govee-update", daemon=True
+        )
+        self._update_thread.start()
+
+    def run_update_loop(self, config) -> None:
+        """Set up the platform, then update sensors every period until stopped."""
+        try:
+            self.setup_platform(config)
+        except Exception as error:
+            _LOGGER.error(f"Error setting up Govee sensors: {error}")
+            return
+        period = config.get(CONF_PERIOD, DEFAULT_PERIOD)
+        while not self._update_stop.wait(period):
+            try:
+                self.update_ble_loop()
+            except Exception as error:
+                # Keep updating, the readings would freeze with the thread
+                _LOGGER.error(f"Error updating Govee sensors: {error}")
+
+    def handle_meta_event(self, hci_packet, source: int = 0) -> None:
+        """Handle received BLE data, source is the index of the adapter."""
+        if self.recorder is not None:
+            self.recorder.write_meta_event(hci_packet.subevent_code, hci_packet.data)
+        if self.watchdog is not None:
+            self.watchdog.adapter_event(source, monotonic())
+
         # If received BLE packet is of type ADVERTISING_REPORT
         if hci_packet.subevent_code == EVT_LE_ADVERTISING_REPORT:
-            packet_mac = hci_packet.data[3:9]
-
-            for device in self.govee_devices:
-                # If received device data matches a configured govee device
-                if BDAddress(device.mac) == BDAddress(packet_mac):
-                    # _LOGGER.debug(
-                    #     "Received packet data for {}: {}".format(
-                    #         BDAddress(device.mac), hex_string(hci_packet.data)
-                    #     )
-                    # )
-                    # parse packet data
-                    ga = GoveeAdvertisement(hci_packet.data)
-
-                    # If mfg data information is defined, update values
-                    if ga.packet is not None:
-                        device.update(ga.temperature, ga.humidity, ga.packet)
-
-                    # Update RSSI and battery level
-                    device.rssi = ga.rssi
-                    device.battery = ga.battery
+            # Replayed events keep their capture time, so that results do not
+            # depend on the replay speed
+            timestamp = getattr(hci_packet, "timestamp", None)
+            if timestamp is None:
+                timestamp = monotonic()
+            if self.ingest is not None:
+                # Parsing is left to the consumer thread
+                self.ingest.push(hci_packet.data, timestamp, source)
+            else:
+                with self._handle_lock:
+                    self.handle_advertising_event(hci_packet.data, timestamp, source)
+
+    def handle_advertising_event(self, data, timestamp: float, source: int = 0) -> None:
+        """Handle the data of an advertising report event."""
+        # Controllers may batch several reports in a single event
+        for report in iter_advertising_reports(data):
+            self.handle_report(report, timestamp, source)
+
+    def consume_ingested_events(self) -> None:
+        """Drain the ingest buffer in batches until stopped."""
+        while not self._ingest_stop.is_set():
+            if self.ingest.wait(0.5):
+                self.drain_ingest()
+        self.drain_ingest()
+
+    def drain_ingest(self) -> None:
+        """Handle the events of the ingest buffer."""
+        # Serialized with the reduction and reset of the fleet store
+        with self._handle_lock:
+            self.ingest.drain(self.handle_advertising_event)
+
+    def handle_report(self, report: memoryview, timestamp: float = 0.0, source: int = 0) -> None:
+        """Handle a single advertising report."""
+        # Reject devices that are not configured with a single lookup
+        address = bytes(report[2:8])
+        device = self.devices_by_address.get(address)
+        if device is None:
+            return
+
+        # Count advertisements heard by several adapters once
+        payload = report[9:-1]
+        if self.dedup is not None:
+            if not self.dedup.accept(address, payload, twos_complement(report[-1], 8), source, timestamp):
+                return
+
+        self.reports[device.mac] = self.reports.get(device.mac, 0) + 1
+
+        # Sensors advertise the same payload until their measurements change,
+        # repeats only refresh RSSI and last seen
+        if self.repeat_window:
+            last = self.last_payloads.get(address)
+            if last is not None and timestamp - last[1] < self.repeat_window and last[0] == payload:
+                self.repeats += 1
+                if self.scheduler is not None:
+                    self.scheduler.observe(address, timestamp)
+                if self.watchdog is not None:
+                    self.watchdog.device_seen(address, timestamp)
+                rssi = twos_complement(report[-1], 8)
+                if self.fleet is None:
+                    device.rssi = rssi
+                else:
+                    self.fleet.update_rssi(self.fleet_slots[device.mac], rssi)
+                return
+
+        # _LOGGER.debug(
+        #     "Received packet data for {}: {}".format(
+        #         device.mac, report.hex()
+        #     )
+        # )
+        # parse packet data
+        ga = parse_report(report)
+        if ga is None:
+            return
+
+        if ga.packet is not None:
+            if self.repeat_window:
+                self.last_payloads[address] = (bytes(payload), timestamp)
+            if self.scheduler is not None:
+                self.scheduler.observe(address, timestamp)
+            if self.watchdog is not None:
+                self.watchdog.device_seen(address, timestamp)
+
+        if self.fleet is not None:
+            # Samples of all devices are aggregated together
+            if ga.packet is not None:
+                self.fleet.update(
+                    self.fleet_slots[device.mac], ga.temperature, ga.humidity, ga.rssi, ga.battery
+                )
+            return
+
+        # If mfg data information is defined, update values
+        if ga.packet is not None:
+            device.update(ga.temperature, ga.humidity, ga.packet)
+
+        # Update RSSI and battery level
+        device.rssi = ga.rssi
+        device.battery = ga.battery
 
     def init_configured_devices(self) -> None:
         """Initialize configured Govee devices."""
@@ -95,10 +261,19 @@ class govee_sensor:
             device.log_spikes = self.config[CONF_LOG_SPIKES]
             device.maximum_temperature = self.config[CONF_TEMP_RANGE_MAX_CELSIUS]
             device.minimum_temperature = self.config[CONF_TEMP_RANGE_MIN_CELSIUS]
+            device.streaming = self.config.get(CONF_STREAMING, DEFAULT_STREAMING)
+            # Median backend may be chosen per device
+            device.median_window = conf_dev.get(
+                CONF_MEDIAN_WINDOW, self.config.get(CONF_MEDIAN_WINDOW, DEFAULT_MEDIAN_WINDOW)
+            )
+            device.median_mode = conf_dev.get(
+                CONF_MEDIAN_MODE, self.config.get(CONF_MEDIAN_MODE, DEFAULT_MEDIAN_MODE)
+            )
 
             if self.config[CONF_ROUNDING]:
                 device.decimal_places = self.config[CONF_DECIMALS]
             self.govee_devices.append(device)
+            self.devices_by_address[address_from_mac(mac)] = device
 
             # Initialize HA sensors
             name = conf_dev.get("name", mac)
@@ -107,9 +282,37 @@ class govee_sensor:
             sensors = [temp_sensor, hum_sensor]
             self.sensors_by_mac[mac] = sensors
 
+        self.repeat_window = self.config.get(CONF_REPEAT_WINDOW, DEFAULT_REPEAT_WINDOW)
+
+        if self.config.get(CONF_FLEET_ENGINE, DEFAULT_FLEET_ENGINE):
+            # NumPy is only required when the fleet engine is enabled
+            from fleet import BLE_HT_fleet
+
+            self.fleet = BLE_HT_fleet(
+                len(self.govee_devices),
+                self.config.get(CONF_FLEET_CAPACITY, DEFAULT_FLEET_CAPACITY),
+            )
+            for slot, device in enumerate(self.govee_devices):
+                self.fleet.configure(slot, device.minimum_temperature, device.maximum_temperature)
+                self.fleet_slots[device.mac] = slot
+
     def update_ble_devices(self, config) -> None:
         """Discover Bluetooth LE devices."""
         # _LOGGER.debug("Discovering Bluetooth LE devices")
+        if self.ingest is not None:
+            # Include the events still in the buffer
+            self.drain_ingest()
+            if self.ingest.dropped or self.ingest.oversized:
+                _LOGGER.debug(
+                    f"Ingest buffer: {self.ingest.dropped} events dropped, {self.ingest.oversized} oversized, high water {self.ingest.high_water}/{self.ingest.capacity}"
+                )
+        if self.repeats:
+            _LOGGER.debug(f"{self.repeats} repeated advertisements not decoded")
+
+        if self.fleet is not None:
+            self.update_fleet_devices(config)
+            return
+
         use_median = config[CONF_USE_MEDIAN]
 
         for device in self.govee_devices:
@@ -122,45 +325,100 @@ class govee_sensor:
             #         )
             #     )
 
-            if device.last_packet:
-                if device.median_temperature is not None:
-                    tempstate_med = float(device.median_temperature)
-                    if use_median:
-                        sensors[0].value = tempstate_med
+            # Statistics of the period, the next one starts without losing samples
+            stats = device.publish()
 
-                if device.mean_temperature is not None:
-                    tempstate_mean = float(device.mean_temperature)
-                    if not use_median:
-                        sensors[0].value = tempstate_mean
+            if stats.last_packet:
+                if use_median:
+                    temperature = stats.median_temperature
+                    humidity = stats.median_humidity
+                else:
+                    temperature = stats.mean_temperature
+                    humidity = stats.mean_humidity
 
-                if device.median_humidity is not None:
-                    humstate_med = float(device.median_humidity)
-                    if use_median:
-                        sensors[1].value = humstate_med
+                if temperature is not None:
+                    sensors[0].value = float(temperature)
 
-                if device.mean_humidity is not None:
-                    humstate_mean = float(device.mean_humidity)
-                    if not use_median:
-                        sensors[1].value = humstate_mean
+                if humidity is not None:
+                    sensors[1].value = float(humidity)
 
+                adapter = self.best_adapter(device.mac)
                 for sensor in sensors:
-                    sensor.rssi = device.rssi
-                    sensor.battery = device.battery
+                    sensor.rssi = stats.rssi
+                    sensor.battery = stats.battery
+                    sensor.adapter = adapter
+
+                _LOGGER.debug(f"{sensors[0].name} - Temp {sensors[0].value}°C - Hum {sensors[1].value}% - RSSI {stats.rssi}dB - Batt {stats.battery}%")
 
-                _LOGGER.debug(f"{sensor.name} - Temp {self.temp}°C - Hum {self.hum}% - RSSI {device.rssi}dB - Batt {device.battery}%")
+    def update_fleet_devices(self, config) -> None:
+        """Reduce the samples of all devices at once and update sensors."""
+        use_median = config[CONF_USE_MEDIAN]
+        # Samples are written by reader threads under the handle lock, none
+        # may land between the reduction and the reset
+        with self._handle_lock:
+            stats = self.fleet.reduce()
+            self.fleet.reset()
+
+        if use_median:
+            temperatures = stats.median_temperature
+            humidities = stats.median_humidity
+        else:
+            temperatures = stats.mean_temperature
+            humidities = stats.mean_humidity
+        if config[CONF_ROUNDING]:
+            temperatures = temperatures.round(config[CONF_DECIMALS])
+            humidities = humidities.round(config[CONF_DECIMALS])
+
+        counts = stats.count.tolist()
+        temperatures = temperatures.tolist()
+        humidities = humidities.tolist()
+        rssis = stats.rssi.tolist()
+        batteries = stats.battery.tolist()
+        if config[CONF_LOG_SPIKES]:
+            temp_spikes = stats.temperature_spikes.sum(axis=1).tolist()
+            hum_spikes = stats.humidity_spikes.sum(axis=1).tolist()
+
+        for slot, device in enumerate(self.govee_devices):
+            if not counts[slot]:
+                continue
+            sensors = self.sensors_by_mac[device.mac]
 
-                device.reset()
+            # NaN when every sample of the period was rejected
+            if temperatures[slot] == temperatures[slot]:
+                sensors[0].value = temperatures[slot]
+            if humidities[slot] == humidities[slot]:
+                sensors[1].value = humidities[slot]
+
+            rssi = round(rssis[slot]) if rssis[slot] == rssis[slot] else None
+            battery = batteries[slot] if batteries[slot] >= 0 else None
+            adapter = self.best_adapter(device.mac)
+            for sensor in sensors:
+                sensor.rssi = rssi
+                sensor.battery = battery
+                sensor.adapter = adapter
+
+            if config[CONF_LOG_SPIKES] and (temp_spikes[slot] or hum_spikes[slot]):
+                _LOGGER.error(f"{temp_spikes[slot]} temperature and {hum_spikes[slot]} humidity spikes ({device.mac})")
+
+    def best_adapter(self, mac: str) -> Optional[str]:
+        """Name of the adapter hearing a device best."""
+        if self.dedup is None:
+            return self.adapter_names[0] if self.adapter_names else None
+        source = self.dedup.best_source(address_from_mac(mac))
+        return None if source is None else self.adapter_names[source]
 
     def update_ble_loop(self) -> None:
         """Lookup Bluetooth LE devices and update status."""
         # _LOGGER.debug("update_ble_loop called")
-        self.adapter.start_scanning()
+        # Adapters scan from run(), or in bursts from the scan scheduler
+        self.check_watchdog()
 
         try:
             # Time to make the dounuts
             self.update_ble_devices(self.config)
         except RuntimeError as error:
-            _LOGGER.debug("Error during Bluetooth LE scan: %s", error)
+            _LOGGER.debug(f"Error during Bluetooth LE scan: {error}")
+        self.update_readings()
 
         # time_offset = dt_util.utcnow() + timedelta(seconds=config[CONF_PERIOD])
         # update_ble_loop() will be called again after time_offset
@@ -169,15 +427,125 @@ class govee_sensor:
         # sleep(self.config[CONF_PERIOD])
         # self.update_ble_loop()
 
+    def update_readings(self) -> None:
+        """Publish the sensor values as a new readings dict, readers never see it change.
+
+        Silent devices keep their last values in their sensors, they are left
+        out so that consumers let them time out.
+        """
+        reports = dict(self.reports)
+        self.readings = {
+            mac: Reading(sensors[0].value, sensors[1].value, sensors[0].rssi, sensors[0].battery)
+            for mac, sensors in self.sensors_by_mac.items()
+            if reports.get(mac, 0) != self._readings_reports.get(mac, 0)
+            and (sensors[0].value is not None or sensors[1].value is not None)
+        }
+        self._readings_reports = reports
+
+    def check_watchdog(self) -> None:
+        """Recover silent adapters and report silent devices."""
+        # Adapters are silent between bursts
+        if self.watchdog is None or (self.scheduler is not None and not self.scheduler.scanning):
+            return
+        now = monotonic()
+        self.watchdog.check(now)
+        for address in self.watchdog.silent_devices(self.devices_by_address, now):
+            _LOGGER.debug(f"{self.devices_by_address[address].mac} not heard since {self.watchdog.last_device.get(address)}")
+
+    def run_scan_scheduler(self, deadline: float) -> None:
+        """Scan in bursts until stopped, the first burst is already running."""
+        start = monotonic()
+        while True:
+            self.scheduler.wait(deadline)
+            for adapter in self.adapters:
+                adapter.stop_scanning()
+            self.scheduler.stop_burst(monotonic())
+
+            start += self.scheduler.period
+            if self._scheduler_stop.wait(max(start - monotonic(), 0.0)):
+                return
+            deadline = self.scheduler.start_burst(monotonic())
+            for adapter in self.adapters:
+                try:
+                    adapter.start_scanning()
+                except (RuntimeError, OSError) as error:
+                    _LOGGER.error(f"Error starting Bluetooth LE scan: {error}")
+            if self.watchdog is not None:
+                self.watchdog.rearm(monotonic())
+
     def run(self):
-        # Initialize bluetooth adapter and begin scanning
-        # XXX: will not work if there are more than 10 HCI devices
+        # Initialize configured Govee devices, before any event is received
+        self.init_configured_devices()
+
+        # Decouple the HCI reader thread from parsing and aggregation
+        capacity = self.config.get(CONF_INGEST_BUFFER, DEFAULT_INGEST_BUFFER)
+        if capacity:
+            self.ingest = IngestRing(
+                capacity, self.config.get(CONF_INGEST_OVERFLOW, DEFAULT_INGEST_OVERFLOW)
+            )
+            self._ingest_stop.clear()
+            self._ingest_thread = Thread(
+                target=self.consume_ingested_events, name="govee-ingest", daemon=True
+            )
+            self._ingest_thread.start()
+
+        # Record received events for offline replay
+        if self.config.get(CONF_CAPTURE_FILE):
+            self.recorder = BtsnoopWriter(self.config[CONF_CAPTURE_FILE])
+
+        # Initialize bluetooth adapters and begin scanning
         try:
-            self.adapter = get_provider().get_adapter(int(self.config[CONF_HCI_DEVICE][-1]))
-            self.adapter._handle_meta_event = self.handle_meta_event
-            # hass.bus.listen("homeassistant_stop", adapter.stop_scanning)
-            self.adapter.start_scanning()
-        except (RuntimeError, OSError, PermissionError) as error:
+            if self.config.get(CONF_REPLAY_FILE):
+                # Replay a capture instead of scanning
+                self.adapter_names = [self.config[CONF_REPLAY_FILE]]
+                self.adapters = [
+                    ReplayAdapter(
+                        self.config[CONF_REPLAY_FILE],
+                        self.config.get(CONF_REPLAY_SPEED, DEFAULT_REPLAY_SPEED),
+                    )
+                ]
+            else:
+                self.adapter_names = adapter_names(self.config.get(CONF_HCI_DEVICE, DEFAULT_HCI_DEVICE))
+                if self.config.get(CONF_BLE_PROVIDER, DEFAULT_BLE_PROVIDER) == BLE_PROVIDER_RAW:
+                    # Optionally let the controllers drop advertisements of other devices
+                    accept_list = None
+                    if self.config.get(CONF_ACCEPT_LIST, DEFAULT_ACCEPT_LIST):
+                        accept_list = list(self.devices_by_address)
+                    interval = scan_units(self.config.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL))
+                    window = scan_units(self.config.get(CONF_SCAN_WINDOW, DEFAULT_SCAN_WINDOW))
+                    if window > interval:
+                        raise ValueError("Scan window longer than scan interval")
+                    self.adapters = [
+                        RawHCIAdapter(
+                            hci_device_id(name), interval=interval, window=window, accept_list=accept_list
+                        )
+                        for name in self.adapter_names
+                    ]
+                else:
+                    # bleson is only required when it is the provider
+                    from bleson import get_provider  # type: ignore
+
+                    self.adapters = [
+                        get_provider().get_adapter(hci_device_id(name)) for name in self.adapter_names
+                    ]
+            if len(self.adapters) > 1:
+                self.dedup = AdapterDeduplicator(self.config.get(CONF_DEDUP_WINDOW, DEFAULT_DEDUP_WINDOW))
+            # Replays are neither scheduled nor watched, they would restart
+            timeout = self.config.get(CONF_WATCHDOG_TIMEOUT, DEFAULT_WATCHDOG_TIMEOUT)
+            if timeout and not self.config.get(CONF_REPLAY_FILE):
+                self.watchdog = ScanWatchdog(self.adapters, timeout)
+            if self.config.get(CONF_SCAN_BURST, DEFAULT_SCAN_BURST) and not self.config.get(CONF_REPLAY_FILE):
+                self.scheduler = ScanScheduler(
+                    self.devices_by_address,
+                    self.config.get(CONF_PERIOD, DEFAULT_PERIOD),
+                    self.config.get(CONF_SCAN_BURST_SAMPLES, DEFAULT_SCAN_BURST_SAMPLES),
+                )
+                deadline = self.scheduler.start_burst(monotonic())
+            for source, adapter in enumerate(self.adapters):
+                adapter._handle_meta_event = partial(self.handle_meta_event, source=source)
+                # hass.bus.listen("homeassistant_stop", adapter.stop_scanning)
+                adapter.start_scanning()
+        except (RuntimeError, OSError, PermissionError, ValueError, ImportError) as error:
             error_msg = "Error connecting to Bluetooth adapter: {}\n\n".format(error)
             error_msg += "Bluetooth adapter troubleshooting:\n"
             error_msg += "  -If running HASS, ensure the correct HCI device is being"
@@ -188,14 +556,49 @@ class govee_sensor:
             # _LOGGER.error(error_msg)
             raise Exception(error_msg) from error
 
-        # Initialize configured Govee devices
-        self.init_configured_devices()
+        if self.scheduler is not None:
+            self._scheduler_stop.clear()
+            self._scheduler_thread = Thread(
+                target=self.run_scan_scheduler, args=(deadline,), name="govee-scan-scheduler", daemon=True
+            )
+            self._scheduler_thread.start()
+
         # Begin sensor update loop
         self.update_ble_loop()
 
+    def stop(self) -> None:
+        """Stop scanning, drain the ingest buffer and close the capture file."""
+        if self._update_thread is not None:
+            self._update_stop.set()
+            self._update_thread.join()
+            self._update_thread = None
+        if self._scheduler_thread is not None:
+            self._scheduler_stop.set()
+            self.scheduler.wake()
+            self._scheduler_thread.join()
+            self._scheduler_thread = None
+        for adapter in self.adapters:
+            adapter.stop_scanning()
+        if self._ingest_thread is not None:
+            self._ingest_stop.set()
+            self._ingest_thread.join()
+            self._ingest_thread = None
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
 
 ###############################################################################
 
+class Reading(NamedTuple):
+    """Values of a device at the end of a period."""
+
+    temperature: Optional[float]
+    humidity: Optional[float]
+    rssi: Optional[int]
+    battery: Optional[int]
+
+
 class MeasurementSensor():
     def __init__(self, mac, name) -> None:
         self._mac = mac
@@ -203,6 +606,7 @@ class MeasurementSensor():
         self._value: float = None
         self._battery: float = None
         self._rssi: float = None
+        self._adapter: str = None
     @property
     def name(self) -> float:
         return self._name
@@ -227,12 +631,18 @@ class MeasurementSensor():
     @rssi.setter
     def rssi(self, value: float) -> None:
         self._rssi = value
+    @property
+    def adapter(self) -> str:
+        return self._adapter
+    @adapter.setter
+    def adapter(self, value: str) -> None:
+        self._adapter = value
 
 
 s = govee_sensor()
 
-def setup_platform_by_macs(macs_names: List[Dict[str, str]]) -> None:
-    config = {
+def config_by_macs(macs_names: List[Dict[str, str]]) -> dict:
+    return {
         CONF_GOVEE_DEVICES: macs_names,
         CONF_LOG_SPIKES: False,
         CONF_ROUNDING: True,
@@ -240,10 +650,21 @@ def setup_platform_by_macs(macs_names: List[Dict[str, str]]) -> None:
         CONF_TEMP_RANGE_MAX_CELSIUS: 45,
         CONF_TEMP_RANGE_MIN_CELSIUS: 0,
         CONF_USE_MEDIAN: True,
+        CONF_STREAMING: False,
+        CONF_FLEET_ENGINE: False,
         CONF_HCI_DEVICE: 'hci0',
         CONF_PERIOD: 30,
     }
-    s.setup_platform(config)
+
+def setup_platform_by_macs(macs_names: List[Dict[str, str]]) -> None:
+    s.setup_platform(config_by_macs(macs_names))
+
+def start_by_macs(macs_names: List[Dict[str, str]]) -> None:
+    """Scan and update sensors in the background, see s.readings."""
+    s.start(config_by_macs(macs_names))
+
+def stop() -> None:
+    s.stop()
 
 def update_ble_loop():
     s.update_ble_loop()
@@ -0,0 +1,334 @@
+"""Synthetic Govee BLE advertisements, encoded as the decoders expect them.
+
+Also simulates fleets of virtual sensors for load testing:
+
+    python3 synthetic.py --devices 1000 --duration 600 fleet.btsnoop
+"""
+from argparse import ArgumentParser
+from heapq import heapify, heapreplace
+from math import sqrt
+from random import Random
+from struct import Struct
+from time import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import sys
+
+from capture import BtsnoopWriter
+from govee_advertisement import address_from_mac
+from hci import (
+    EVT_LE_ADVERTISING_REPORT,
+    GAP_FLAGS,
+    GAP_MFG_DATA,
+    GAP_NAME_COMPLETE,
+    HCI_MAX_EVENT_SIZE,
+    HCIMetaEvent,
+)
+
+_TEMP_HUM_BATT = Struct("<hHB")
+
+# Largest advertising report event data: event parameters are at most 255
+# bytes, the subevent code included
+MAX_EVENT_DATA = HCI_MAX_EVENT_SIZE - 4
+
+
+def ad_structure(gap_type: int, payload: bytes) -> bytes:
+    """Encode an advertising data structure."""
+    return bytes((len(payload) + 1, gap_type)) + payload
+
+
+def encode_report(
+    mac: str, advertising_data: bytes, rssi: int, event_type: int = 0, address_type: int = 0
+) -> bytes:
+    """Encode a single LE advertising report."""
+    return (
+        bytes((event_type, address_type))
+        + address_from_mac(mac)
+        + bytes((len(advertising_data),))
+        + advertising_data
+        + bytes((rssi & 0xFF,))
+    )
+
+
+def encode_event(reports: Sequence[bytes]) -> bytes:
+    """Encode the parameters of an LE advertising report event."""
+    return bytes((len(reports),)) + b"".join(reports)
+
+
+def _packed(temperature: float, humidity: float) -> bytes:
+    """Encode temperature/humidity as a 24 bit packed value."""
+    value = round(abs(temperature) * 10) * 1000 + round(humidity * 10)
+    if temperature < 0:
+        value |= 0x800000
+    return value.to_bytes(3, "big")
+
+
+def _centi(temperature: float, humidity: float, battery: int) -> bytes:
+    """Encode temperature/humidity in hundredths."""
+    return _TEMP_HUM_BATT.pack(round(temperature * 100), round(humidity * 100), battery)
+
+
+def encode_h5075(temperature: float, humidity: float, battery: int) -> bytes:
+    """Advertising data of a Govee H5072/H5075."""
+    return ad_structure(GAP_FLAGS, b"\x05") + ad_structure(
+        GAP_MFG_DATA, b"\x88\xec\x00" + _packed(temperature, humidity) + bytes((battery, 0))
+    )
+
+
+def encode_h5102(temperature: float, humidity: float, battery: int) -> bytes:
+    """Advertising data of a Govee H5101/H5102."""
+    return ad_structure(GAP_FLAGS, b"\x05") + ad_structure(
+        GAP_MFG_DATA, b"\x01\x00\x01\x01" + _packed(temperature, humidity) + bytes((battery,))
+    )
+
+
+def encode_h5074(temperature: float, humidity: float, battery: int) -> bytes:
+    """Advertising data of a Govee H5074."""
+    return ad_structure(GAP_FLAGS, b"\x06") + ad_structure(
+        GAP_MFG_DATA, b"\x88\xec\x00" + _centi(temperature, humidity, battery) + b"\x02"
+    )
+
+
+def encode_h5051(temperature: float, humidity: float, battery: int) -> bytes:
+    """Advertising data of a Govee H5051."""
+    return ad_structure(GAP_FLAGS, b"\x06") + ad_structure(
+        GAP_MFG_DATA, b"\x88\xec\x00" + _centi(temperature, humidity, battery) + b"\x02\x00\x00"
+    )
+
+
+def encode_h5179(temperature: float, humidity: float, battery: int) -> bytes:
+    """Advertising data of a Govee H5179."""
+    return ad_structure(GAP_FLAGS, b"\x06") + ad_structure(
+        GAP_MFG_DATA, b"\x01\x88\xec\x00\x01\x01" + _centi(temperature, humidity, battery)
+    )
+
+
+# Advertising data encoders by model
+ENCODERS: Dict[str, Callable[[float, float, int], bytes]] = {
+    "H5075": encode_h5075,
+    "H5102": encode_h5102,
+    "H5074": encode_h5074,
+    "H5051": encode_h5051,
+    "H5179": encode_h5179,
+}
+
+
+def encode_noise(rng: Random) -> bytes:
+    """Advertising data of a non Govee device (phone, beacon, TV...)."""
+    kind = rng.randrange(3)
+    if kind == 0:
+        # iBeacon
+        return ad_structure(GAP_FLAGS, b"\x06") + ad_structure(
+            GAP_MFG_DATA, b"\x4c\x00\x02\x15" + bytes(rng.randrange(256) for _ in range(21))
+        )
+    if kind == 1:
+        name = "Phone-{:04d}".format(rng.randrange(10000)).encode("ascii")
+        return ad_structure(GAP_FLAGS, b"\x1a") + ad_structure(GAP_NAME_COMPLETE, name)
+    return ad_structure(
+        GAP_MFG_DATA, bytes(rng.randrange(256) for _ in range(rng.randrange(2, 24)))
+    )
+
+
+def random_mac(rng: Random, prefix: str = "") -> str:
+    """Random MAC address, optionally starting with an OUI prefix."""
+    octets = [int(x, 16) for x in prefix.split(":") if x]
+    octets += [rng.randrange(256) for _ in range(6 - len(octets))]
+    return ":".join(format(x, "02X") for x in octets)
+
+
+def govee_corpus(
+    size: int, noise_ratio: float = 0.5, macs: Optional[Dict[str, str]] = None, seed: int = 0
+) -> List[bytes]:
+    """Deterministic corpus of single report advertising events.
+
+    Events of every supported model, with positive and negative
+    temperatures, are mixed with noise_ratio non Govee events.  macs maps
+    the model of every Govee device to its MAC address.
+    """
+    rng = Random(seed)
+    if macs is None:
+        macs = {model: random_mac(rng, "A4:C1:38") for model in ENCODERS}
+    models = list(macs)
+    corpus = []
+    for i in range(size):
+        if rng.random() < noise_ratio:
+            data = encode_noise(rng)
+            mac = random_mac(rng)
+        else:
+            model = models[i % len(models)]
+            data = ENCODERS[model](
+                round(rng.uniform(-20.0, 40.0), 1),
+                round(rng.uniform(5.0, 95.0), 1),
+                rng.randrange(101),
+            )
+            mac = macs[model]
+        corpus.append(encode_event([encode_report(mac, data, rng.randrange(-100, -30))]))
+    return corpus
+
+
+class VirtualDevice:
+    """Simulated Govee thermometer/hygrometer."""
+
+    def __init__(
+        self, mac: str, model: str, interval: float, rssi: float, temperature: float, humidity: float, battery: int
+    ) -> None:
+        """Init."""
+        self.mac = mac
+        self.model = model
+        self.interval = interval
+        self.rssi = rssi
+        self.temperature = temperature
+        self.humidity = humidity
+        self.battery = battery
+
+
+class FleetSimulator:
+    """Fleet of virtual Govee devices of mixed models.
+
+    Each device advertises every interval seconds (with jitter), its RSSI
+    follows a normal distribution and its temperature and humidity drift
+    as random walks.  Spikes (out of range temperatures) and lost packets
+    are injected with the given probabilities.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        models: Sequence[str] = tuple(ENCODERS),
+        interval: float = 2.0,
+        jitter: float = 0.1,
+        rssi_mean: float = -75.0,
+        rssi_sd: float = 8.0,
+        drift: float = 0.01,
+        spike_probability: float = 0.001,
+        loss_probability: float = 0.05,
+        batch: int = 1,
+        seed: int = 0,
+    ) -> None:
+        """Init."""
+        self._rng = Random(seed)
+        self._jitter = jitter
+        self._rssi_sd = rssi_sd
+        self._drift = drift
+        self._spike_probability = spike_probability
+        self._loss_probability = loss_probability
+        self._batch = batch
+        self.devices = [
+            VirtualDevice(
+                "A4:C1:{:02X}:{:02X}:{:02X}:{:02X}".format(*(i + 1).to_bytes(4, "big")),
+                models[i % len(models)],
+                interval * self._rng.uniform(0.8, 1.2),
+                self._rng.gauss(rssi_mean, rssi_sd),
+                self._rng.uniform(10.0, 30.0),
+                self._rng.uniform(30.0, 70.0),
+                self._rng.randrange(20, 101),
+            )
+            for i in range(size)
+        ]
+
+    def configured_devices(self) -> List[Dict[str, str]]:
+        """Devices as configured in CONF_GOVEE_DEVICES."""
+        return [{"mac": device.mac, "name": device.model} for device in self.devices]
+
+    def _advertise(self, device: VirtualDevice, elapsed: float) -> bytes:
+        """Drift the measurements of a device and encode its report."""
+        rng = self._rng
+        step = self._drift * sqrt(elapsed)
+        device.temperature = min(max(device.temperature + rng.gauss(0.0, step), -20.0), 50.0)
+        device.humidity = min(max(device.humidity + rng.gauss(0.0, step * 5), 1.0), 99.0)
+        temperature = device.temperature
+        if rng.random() < self._spike_probability:
+            temperature = rng.choice((-40.0, 99.0))
+        data = ENCODERS[device.model](round(temperature, 1), round(device.humidity, 1), device.battery)
+        rssi = min(max(round(rng.gauss(device.rssi, self._rssi_sd)), -127), -1)
+        return encode_report(device.mac, data, rssi)
+
+    def events(self, duration: float, start: float = 0.0) -> Iterator[Tuple[float, bytes]]:
+        """Yield (timestamp, event data) of the fleet's advertisements, in order."""
+        rng = self._rng
+        schedule = [
+            (start + rng.uniform(0.0, device.interval), i) for i, device in enumerate(self.devices)
+        ]
+        heapify(schedule)
+        last = [start] * len(self.devices)
+        end = start + duration
+        reports: List[bytes] = []
+        size = 0  # Bytes of the pending reports
+        while schedule and schedule[0][0] < end:
+            timestamp, i = schedule[0]
+            device = self.devices[i]
+            heapreplace(
+                schedule,
+                (timestamp + device.interval * rng.uniform(1 - self._jitter, 1 + self._jitter), i),
+            )
+            report = self._advertise(device, timestamp - last[i])
+            last[i] = timestamp
+            if rng.random() < self._loss_probability:
+                continue
+            # Like a controller, send the pending reports when this one does not fit
+            if reports and 1 + size + len(report) > MAX_EVENT_DATA:
+                yield timestamp, encode_event(reports)
+                reports = []
+                size = 0
+            reports.append(report)
+            size += len(report)
+            if len(reports) >= self._batch:
+                yield timestamp, encode_event(reports)
+                reports = []
+                size = 0
+        if reports:
+            yield end, encode_event(reports)
+
+    def write_capture(self, path: str, duration: float, start: Optional[float] = None) -> int:
+        """Write the fleet's advertisements to a btsnoop file."""
+        count = 0
+        with BtsnoopWriter(path) as writer:
+            for timestamp, data in self.events(duration, time() if start is None else start):
+                writer.write_meta_event(EVT_LE_ADVERTISING_REPORT, data, timestamp)
+                count += 1
+        return count
+
+    def feed(self, handler: Callable[[HCIMetaEvent], None], duration: float) -> int:
+        """Feed the fleet's advertisements to handler, as fast as possible."""
+        count = 0
+        for _, data in self.events(duration):
+            handler(HCIMetaEvent(EVT_LE_ADVERTISING_REPORT, data))
+            count += 1
+        return count
+
+
+def main(argv: Sequence[str]) -> int:
+    """Command line entry point."""
+    parser = ArgumentParser(description="Write the advertisements of a simulated fleet to a btsnoop file.")
+    parser.add_argument("output", help="btsnoop file")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--models", default=",".join(ENCODERS), help="comma separated models")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between advertisements")
+    parser.add_argument("--rssi-mean", type=float, default=-75.0)
+    parser.add_argument("--rssi-sd", type=float, default=8.0)
+    parser.add_argument("--drift", type=float, default=0.01, help="temperature drift, degrees per sqrt(s)")
+    parser.add_argument("--spikes", type=float, default=0.001, help="spike probability")
+    parser.add_argument("--loss", type=float, default=0.05, help="packet loss probability")
+    parser.add_argument("--batch", type=int, default=1, help="reports per event")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    simulator = FleetSimulator(
+        args.devices,
+        args.models.split(","),
+        args.interval,
+        rssi_mean=args.rssi_mean,
+        rssi_sd=args.rssi_sd,
+        drift=args.drift,
+        spike_probability=args.spikes,
+        loss_probability=args.loss,
+        batch=args.batch,
+        seed=args.seed,
+    )
+    count = simulator.write_capture(args.output, args.duration)
+    print("{} events written to {}".format(count, args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,135 @@
+"""Programming of the controller accept list through a recording command sink."""
+import socket
+
+import pytest
+
+from govee_advertisement import address_from_mac
+from hci import (
+    ADDRESS_TYPE_PUBLIC,
+    ADDRESS_TYPE_RANDOM,
+    OCF_LE_ADD_DEVICE_TO_ACCEPT_LIST,
+    OCF_LE_CLEAR_ACCEPT_LIST,
+    OCF_LE_READ_ACCEPT_LIST_SIZE,
+    OCF_LE_SET_SCAN_PARAMETERS,
+    OGF_LE_CTL,
+    SCAN_FILTER_ACCEPT_ALL,
+    SCAN_FILTER_ACCEPT_LIST,
+    HCICommandSink,
+    RawHCIAdapter,
+    le_set_scan_enable,
+    le_set_scan_parameters,
+    program_accept_list,
+)
+
+ADDRESSES = [address_from_mac("A4:C1:38:00:00:01"), address_from_mac("A4:C1:38:00:00:02")]
+
+
+class RecordingSink(HCICommandSink):
+    """Command sink recording the commands issued, answering like a controller.
+
+    refuse maps an opcode to the number of successful commands before it
+    is refused.
+    """
+
+    def __init__(self, size: int = 8, refuse=None):
+        """Init."""
+        self.size = size
+        self.refuse = dict(refuse or {})
+        self.commands = []
+
+    def command(self, ogf, ocf, parameters=b""):
+        """Record a command, return its status and return parameters."""
+        self.commands.append((ogf, ocf, bytes(parameters)))
+        if ocf in self.refuse:
+            if not self.refuse[ocf]:
+                return b"\x07"  # Memory capacity exceeded
+            self.refuse[ocf] -= 1
+        if ocf == OCF_LE_READ_ACCEPT_LIST_SIZE:
+            return bytes((0, self.size))
+        return b"\0"
+
+
+class RecordingAdapter(RecordingSink, RawHCIAdapter):
+    """Raw HCI adapter issuing its commands to a RecordingSink."""
+
+    def __init__(self, sock, accept_list, **kwargs):
+        """Init."""
+        RecordingSink.__init__(self, **kwargs)
+        RawHCIAdapter.__init__(self, 0, sock=sock, accept_list=accept_list)
+
+
+def entries():
+    """Accept list entries expected for ADDRESSES."""
+    return [
+        (OGF_LE_CTL, OCF_LE_ADD_DEVICE_TO_ACCEPT_LIST, bytes((address_type,)) + address)
+        for address in ADDRESSES
+        for address_type in (ADDRESS_TYPE_PUBLIC, ADDRESS_TYPE_RANDOM)
+    ]
+
+
+@pytest.fixture
+def controller():
+    """Socketpair ends: the adapter's and the controller's."""
+    ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    theirs.settimeout(2)
+    yield ours, theirs
+    ours.close()
+    theirs.close()
+
+
+def test_program_accept_list():
+    """The size is read, the list cleared, then every address added with both types."""
+    sink = RecordingSink()
+    assert program_accept_list(sink, ADDRESSES)
+    assert sink.commands == [
+        (OGF_LE_CTL, OCF_LE_READ_ACCEPT_LIST_SIZE, b""),
+        (OGF_LE_CTL, OCF_LE_CLEAR_ACCEPT_LIST, b""),
+    ] + entries()
+
+
+def test_accept_list_overflow():
+    """Addresses not fitting the list are left to software filtering, untouched."""
+    sink = RecordingSink(size=3)
+    assert not program_accept_list(sink, ADDRESSES)
+    assert sink.commands == [(OGF_LE_CTL, OCF_LE_READ_ACCEPT_LIST_SIZE, b"")]
+
+
+def test_accept_list_refused():
+    """An entry refused midway clears the list again."""
+    sink = RecordingSink(refuse={OCF_LE_ADD_DEVICE_TO_ACCEPT_LIST: 2})
+    assert not program_accept_list(sink, ADDRESSES)
+    assert sink.commands[-2:] == [entries()[2], (OGF_LE_CTL, OCF_LE_CLEAR_ACCEPT_LIST, b"")]
+    assert entries()[3] not in sink.commands
+
+
+def test_scan_filter_policy(controller):
+    """With the accept list programmed, scan parameters select the accept list filter policy."""
+    ours, theirs = controller
+    adapter = RecordingAdapter(ours, ADDRESSES)
+    adapter.start_scanning()
+    try:
+        assert adapter.accept_list_active
+        assert adapter.commands[-1] == (
+            OGF_LE_CTL,
+            OCF_LE_SET_SCAN_PARAMETERS,
+            le_set_scan_parameters(filter_policy=SCAN_FILTER_ACCEPT_LIST)[4:],
+        )
+        assert [theirs.recv(64) for _ in range(2)] == [le_set_scan_enable(False), le_set_scan_enable(True)]
+    finally:
+        adapter.stop_scanning()
+
+
+def test_scan_filter_policy_refused(controller):
+    """A refused filter policy falls back to software filtering of every advertisement."""
+    ours, theirs = controller
+    adapter = RecordingAdapter(ours, ADDRESSES, refuse={OCF_LE_SET_SCAN_PARAMETERS: 0})
+    adapter.start_scanning()
+    try:
+        assert adapter.accept_list_active is False
+        assert [theirs.recv(64) for _ in range(3)] == [
+            le_set_scan_enable(False),
+            le_set_scan_parameters(filter_policy=SCAN_FILTER_ACCEPT_ALL),
+            le_set_scan_enable(True),
+        ]
+    finally:
+        adapter.stop_scanning()
@@ -0,0 +1,85 @@
+"""Demultiplexing and parsing of LE advertising report events."""
+from random import Random
+
+import pytest
+
+from govee_advertisement import iter_advertising_reports, parse_advertisement, parse_report
+from synthetic import ENCODERS, encode_event, encode_noise, encode_report
+
+MACS = ["A4:C1:38:00:00:{:02X}".format(i) for i in range(len(ENCODERS))]
+
+
+def govee_report(index: int, model: str) -> bytes:
+    """Report of a configured device."""
+    return encode_report(MACS[index], ENCODERS[model](20.0 + index, 40.0 + index, 50 + index), -50 - index)
+
+
+def test_mixed_models():
+    """Every report of an event is yielded and parsed, in order."""
+    reports = [govee_report(i, model) for i, model in enumerate(ENCODERS)]
+    event = encode_event(reports)
+
+    views = list(iter_advertising_reports(event))
+    assert [bytes(view) for view in views] == reports
+
+    for i, view in enumerate(views):
+        reading = parse_report(view)
+        assert reading.mac == MACS[i]
+        assert reading.rssi == -50 - i
+        assert reading.temperature == pytest.approx(20.0 + i, abs=0.1)
+        assert reading.humidity == pytest.approx(40.0 + i, abs=0.1)
+        assert reading.battery == 50 + i
+        assert reading.packet is not None
+
+
+def test_noise_between_govee_reports():
+    """Reports of other devices are yielded, but carry no Govee packet."""
+    noise = encode_report("11:22:33:44:55:66", encode_noise(Random(0)), -80)
+    event = encode_event([govee_report(0, "H5075"), noise, govee_report(1, "H5179")])
+
+    readings = [parse_report(view) for view in iter_advertising_reports(event)]
+    assert len(readings) == 3
+    assert readings[0].packet is not None
+    assert readings[1].packet is None
+    assert readings[2].packet is not None
+
+
+def test_no_reports():
+    """An event announcing no report yields nothing."""
+    assert list(iter_advertising_reports(encode_event([]))) == []
+    assert list(iter_advertising_reports(b"")) == []
+
+
+@pytest.mark.parametrize("cut", [1, 5, 12])
+def test_truncated_last_report(cut):
+    """Iteration stops before a truncated report, earlier ones are kept."""
+    reports = [govee_report(0, "H5075"), govee_report(1, "H5102"), govee_report(2, "H5179")]
+    event = encode_event(reports)[:-cut]
+
+    views = list(iter_advertising_reports(event))
+    assert [bytes(view) for view in views] == reports[:2]
+
+
+def test_more_reports_announced_than_present():
+    """A report count larger than the data stops at the end of the data."""
+    reports = [govee_report(0, "H5074"), govee_report(1, "H5051")]
+    event = bytes((5,)) + b"".join(reports)
+
+    assert [bytes(view) for view in iter_advertising_reports(event)] == reports
+
+
+def test_parse_truncated_report():
+    """A report too short for its header is not parsed."""
+    assert parse_report(memoryview(govee_report(0, "H5075"))[:6]) is None
+
+
+def test_parse_advertisement_first_report():
+    """Only the first report of a multi-report event is parsed."""
+    first = encode_report(MACS[0], ENCODERS["H5075"](21.0, 41.0, 60), -40)
+    second = encode_report(MACS[1], ENCODERS["H5075"](22.0, 42.0, 70), -90)
+
+    reading = parse_advertisement(encode_event([first, second]))
+    assert reading.mac == MACS[0]
+    assert reading.rssi == -40
+    assert reading.battery == 60
+    assert parse_advertisement(encode_event([])) is None
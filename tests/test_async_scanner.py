@@ -0,0 +1,88 @@
+"""asyncio scanner reading one or several socketpair stand-in adapters."""
+import asyncio
+import socket
+
+import pytest
+
+from async_scanner import GoveeScanner
+from hci import EVT_LE_ADVERTISING_REPORT, encode_meta_event, le_set_scan_enable
+from synthetic import encode_event, encode_h5075, encode_report
+
+MAC = "A4:C1:38:00:00:01"
+
+
+def adapter_pair():
+    """Scanner end and adapter end of a stand-in HCI socket, keeping packet boundaries."""
+    return socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+
+
+def advertisement(temperature: float, rssi: int = -60) -> bytes:
+    """Meta event carrying a single H5075 report."""
+    report = encode_report(MAC, encode_h5075(temperature, 45.0, 80), rssi)
+    return encode_meta_event(EVT_LE_ADVERTISING_REPORT, encode_event([report]))
+
+
+async def collect(scanner: GoveeScanner):
+    """Readings until the scanner ends them."""
+    return [reading async for reading in scanner.readings()]
+
+
+def test_single_adapter():
+    """Readings of an adapter are streamed, closing it ends them."""
+
+    async def scan():
+        ours, theirs = adapter_pair()
+        async with GoveeScanner({}, sock=ours) as scanner:
+            theirs.send(advertisement(21.0))
+            theirs.shutdown(socket.SHUT_WR)
+            readings = await asyncio.wait_for(collect(scanner), 2)
+        return readings
+
+    readings = asyncio.run(scan())
+    assert [reading.mac for reading in readings] == [MAC]
+    assert readings[0].temperature == pytest.approx(21.0, abs=0.1)
+
+
+def test_adapters_deduplicated():
+    """An advertisement heard by two adapters is streamed once."""
+
+    async def scan():
+        pairs = [adapter_pair(), adapter_pair()]
+        async with GoveeScanner({}, sock=[ours for ours, _ in pairs]) as scanner:
+            for _, theirs in pairs:
+                theirs.send(advertisement(21.0))
+            # Losing one adapter does not end the readings of the other
+            pairs[0][1].shutdown(socket.SHUT_WR)
+            await asyncio.sleep(0.05)
+            pairs[1][1].send(advertisement(22.0, -80))
+            pairs[1][1].shutdown(socket.SHUT_WR)
+            readings = await asyncio.wait_for(collect(scanner), 2)
+        return readings
+
+    readings = asyncio.run(scan())
+    assert [reading.temperature for reading in readings] == pytest.approx([21.0, 22.0], abs=0.1)
+
+
+def test_scan_stopped_on_exit():
+    """Every adapter still read is told to stop scanning."""
+
+    async def scan():
+        pairs = [adapter_pair(), adapter_pair()]
+        async with GoveeScanner({}, sock=[ours for ours, _ in pairs]):
+            pass
+        return [theirs for _, theirs in pairs]
+
+    for theirs in asyncio.run(scan()):
+        packets = list(iter(lambda: theirs.recv(64), b""))
+        assert packets[-1] == le_set_scan_enable(False)
+
+
+def test_invalid_adapter_name():
+    """Comma separated names are all checked before scanning."""
+
+    async def scan():
+        async with GoveeScanner({"hci_device": "hci0,bluetooth"}):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(scan())
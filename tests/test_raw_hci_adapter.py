@@ -0,0 +1,70 @@
+"""Raw HCI adapter driven through a socketpair stand-in controller."""
+import socket
+from threading import Event
+
+import pytest
+
+from hci import (
+    EVT_LE_ADVERTISING_REPORT,
+    RawHCIAdapter,
+    encode_meta_event,
+    le_set_scan_enable,
+    le_set_scan_parameters,
+)
+
+
+@pytest.fixture
+def controller():
+    """Adapter on one end of a socketpair, the controller end for the test."""
+    ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    theirs.settimeout(2)
+    adapter = RawHCIAdapter(0, sock=ours, interval=0x0020, window=0x0010)
+    yield adapter, theirs
+    adapter.stop_scanning()
+    ours.close()
+    theirs.close()
+
+
+def test_start_commands(controller):
+    """Scanning is disabled before the parameters are set, then enabled."""
+    adapter, theirs = controller
+    adapter.start_scanning()
+
+    assert [theirs.recv(64) for _ in range(3)] == [
+        le_set_scan_enable(False),
+        le_set_scan_parameters(interval=0x0020, window=0x0010),
+        le_set_scan_enable(True),
+    ]
+    assert adapter.accept_list_active is None
+
+
+def test_meta_event_delivered(controller):
+    """LE meta events reach the handler, other packets are ignored."""
+    adapter, theirs = controller
+    received = []
+    delivered = Event()
+
+    def handle(event):
+        received.append((event.subevent_code, bytes(event.data)))
+        delivered.set()
+
+    adapter._handle_meta_event = handle
+    adapter.start_scanning()
+    theirs.send(b"\x04\x0e\x04\x01\x0c\x20\x00")  # Command complete
+    theirs.send(encode_meta_event(EVT_LE_ADVERTISING_REPORT, b"\x01\x02\x03"))
+
+    assert delivered.wait(2)
+    assert received == [(EVT_LE_ADVERTISING_REPORT, b"\x01\x02\x03")]
+    assert adapter.events == 1
+
+
+def test_stop_disables_scanning(controller):
+    """Stopping sends scan disable and ends the reader."""
+    adapter, theirs = controller
+    adapter.start_scanning()
+    for _ in range(3):
+        theirs.recv(64)
+
+    adapter.stop_scanning()
+    assert theirs.recv(64) == le_set_scan_enable(False)
+    assert adapter._thread is None
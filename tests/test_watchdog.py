@@ -0,0 +1,106 @@
+"""Recovery of silent adapters by the scan watchdog."""
+from watchdog import RECOVERY_REOPEN, RECOVERY_RESCAN, RECOVERY_RESET, ScanWatchdog
+
+
+class SilentAdapter:
+    """Stand-in adapter recording recovery actions, reset may fail."""
+
+    def __init__(self, failing_reset: bool = False) -> None:
+        self.actions = []
+        self.failing_reset = failing_reset
+
+    def rescan(self) -> None:
+        self.actions.append("rescan")
+
+    def reopen(self) -> None:
+        self.actions.append("reopen")
+
+    def reset(self) -> None:
+        self.actions.append("reset")
+        if self.failing_reset:
+            raise OSError("Controller gone")
+
+
+class PlainAdapter:
+    """Stand-in adapter without recovery actions."""
+
+    def __init__(self) -> None:
+        self.actions = []
+
+    def start_scanning(self) -> None:
+        self.actions.append("start")
+
+    def stop_scanning(self) -> None:
+        self.actions.append("stop")
+
+
+def test_escalation_and_backoff():
+    """Actions escalate, attempts are spaced by a doubling backoff."""
+    adapter = SilentAdapter(failing_reset=True)
+    watchdog = ScanWatchdog([adapter], timeout=10, max_backoff=80, now=0)
+
+    assert watchdog.check(5) == []
+    assert watchdog.check(10) == [(0, RECOVERY_RESCAN)]
+    assert watchdog.check(19) == []
+    assert watchdog.check(20) == [(0, RECOVERY_REOPEN)]
+    assert watchdog.check(39) == []
+    assert watchdog.check(40) == [(0, RECOVERY_RESET)]
+    assert watchdog.check(79) == []
+    assert watchdog.check(80) == [(0, RECOVERY_RESET)]
+    # Backoff capped at max_backoff
+    assert watchdog.check(159) == []
+    assert watchdog.check(160) == [(0, RECOVERY_RESET)]
+    assert watchdog.check(240) == [(0, RECOVERY_RESET)]
+
+    assert adapter.actions == ["rescan", "reopen", "reset", "reset", "reset", "reset"]
+    assert watchdog.recoveries == {RECOVERY_RESCAN: 1, RECOVERY_REOPEN: 1, RECOVERY_RESET: 4}
+    assert watchdog.failures == 4
+
+
+def test_events_back_reset_escalation():
+    """Once events return, the next silence starts over with a rescan."""
+    adapter = SilentAdapter()
+    watchdog = ScanWatchdog([adapter], timeout=10, now=0)
+    watchdog.check(10)
+    watchdog.check(20)
+    assert adapter.actions == ["rescan", "reopen"]
+
+    watchdog.adapter_event(0, 25)
+    assert watchdog.check(30) == []
+    assert watchdog.recovered == 1
+
+    assert watchdog.check(35) == [(0, RECOVERY_RESCAN)]
+    assert watchdog.check(44) == []
+    assert watchdog.check(45) == [(0, RECOVERY_REOPEN)]
+    assert watchdog.failures == 0
+
+
+def test_only_silent_adapters_recovered():
+    """Adapters are watched independently."""
+    silent, active = SilentAdapter(), SilentAdapter()
+    watchdog = ScanWatchdog([silent, active], timeout=10, now=0)
+    watchdog.adapter_event(1, 8)
+
+    assert watchdog.check(10) == [(0, RECOVERY_RESCAN)]
+    assert active.actions == []
+
+
+def test_restart_without_recovery_actions():
+    """Adapters lacking an action are restarted instead."""
+    adapter = PlainAdapter()
+    watchdog = ScanWatchdog([adapter], timeout=10, now=0)
+    watchdog.check(10)
+
+    assert adapter.actions == ["stop", "start"]
+
+
+def test_rearm_and_silent_devices():
+    """Scanning pauses are not silences, silent devices are reported."""
+    adapter = SilentAdapter()
+    watchdog = ScanWatchdog([adapter], timeout=10, device_timeout=30, now=0)
+    watchdog.rearm(50)
+    assert watchdog.check(55) == []
+
+    watchdog.device_seen(b"\x01" * 6, 20)
+    assert watchdog.silent_devices([b"\x01" * 6, b"\x02" * 6], 40) == [b"\x02" * 6]
+    assert watchdog.silent_devices([b"\x01" * 6], 50) == [b"\x01" * 6]
@@ -0,0 +1,116 @@
+"""Detection of silent adapters and devices, and adapter recovery."""
+from time import monotonic
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# Recovery actions, by escalation level
+RECOVERY_RESCAN = 1
+RECOVERY_REOPEN = 2
+RECOVERY_RESET = 3
+
+RECOVERY_NAMES = {
+    RECOVERY_RESCAN: "rescan",
+    RECOVERY_REOPEN: "reopen",
+    RECOVERY_RESET: "reset",
+}
+
+# Longest wait between recovery attempts, in seconds
+DEFAULT_MAX_BACKOFF = 3600.0
+
+
+def recover(adapter, level: int) -> None:
+    """Apply a recovery action, or restart scanning if the adapter lacks it."""
+    action = getattr(adapter, RECOVERY_NAMES[level], None)
+    if action is not None:
+        action()
+    else:
+        adapter.stop_scanning()
+        adapter.start_scanning()
+
+
+class ScanWatchdog:
+    """Track the last event of adapters and devices, recover silent adapters.
+
+    An adapter silent for timeout seconds is recovered with escalating
+    actions: scan enable again, reopen its socket, then reset the
+    controller.  Attempts are spaced by an exponential backoff starting at
+    timeout, and escalation starts over once the adapter delivers events.
+    """
+
+    def __init__(
+        self,
+        adapters: Sequence,
+        timeout: float,
+        device_timeout: Optional[float] = None,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        now: Optional[float] = None,
+    ) -> None:
+        """Init."""
+        if now is None:
+            now = monotonic()
+        self._adapters = adapters
+        self._timeout = timeout
+        self._device_timeout = timeout if device_timeout is None else device_timeout
+        self._max_backoff = max_backoff
+        self._start = now
+        self.last_event: List[float] = [now] * len(adapters)  # By adapter index
+        self.last_device: Dict[bytes, float] = {}  # By device address
+        self._levels = [0] * len(adapters)
+        self._backoff = [timeout] * len(adapters)
+        self._next_attempt = [now] * len(adapters)
+        self.recoveries = dict.fromkeys(RECOVERY_NAMES, 0)
+        self.failures = 0
+        self.recovered = 0
+
+    def rearm(self, now: float) -> None:
+        """Restart silence timers, when scanning starts after a pause."""
+        for source in range(len(self.last_event)):
+            self.last_event[source] = max(self.last_event[source], now)
+
+    def adapter_event(self, source: int, timestamp: float) -> None:
+        """Track an event of an adapter."""
+        self.last_event[source] = timestamp
+
+    def device_seen(self, address: bytes, timestamp: float) -> None:
+        """Track a report of a device."""
+        self.last_device[address] = timestamp
+
+    def silent_devices(self, addresses: Iterable[bytes], now: float) -> List[bytes]:
+        """Devices not heard for the device timeout."""
+        since = now - self._device_timeout
+        return [address for address in addresses if self.last_device.get(address, self._start) <= since]
+
+    def check(self, now: float) -> List[Tuple[int, int]]:
+        """Recover silent adapters, return (adapter index, level) of the attempts."""
+        attempts = []
+        for source, adapter in enumerate(self._adapters):
+            level = self._levels[source]
+            if now - self.last_event[source] < self._timeout:
+                if level:
+                    # Events are back
+                    self.recovered += 1
+                    self._levels[source] = 0
+                    self._backoff[source] = self._timeout
+                    self._next_attempt[source] = now
+                continue
+            if now < self._next_attempt[source]:
+                continue
+
+            level = self._levels[source] = min(level + 1, RECOVERY_RESET)
+            self.recoveries[level] += 1
+            self._next_attempt[source] = now + self._backoff[source]
+            self._backoff[source] = min(self._backoff[source] * 2, self._max_backoff)
+            attempts.append((source, level))
+            _LOGGER.warning(
+                "Adapter {} silent for {:.0f} s, {}".format(
+                    source, now - self.last_event[source], RECOVERY_NAMES[level]
+                )
+            )
+            try:
+                recover(adapter, level)
+            except (RuntimeError, OSError) as error:
+                self.failures += 1
+                _LOGGER.error("Recovery of adapter {} failed: {}".format(source, error))
+        return attempts